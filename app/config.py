@@ -12,6 +12,25 @@ class Settings(BaseSettings):
     ADVERTISER_ID_SB: str = os.getenv('ADVERTISER_ID_SB', '')
     API_URL: str = 'https://business-api.tiktok.com/open_api/v1.3'
     API_URL_SB: str = 'https://sandbox-ads.tiktok.com/open_api/v1.3'
+    # Request profiling (disabled while ADMIN_TOKEN is empty)
+    ADMIN_TOKEN: str = os.getenv('ADMIN_TOKEN', '')
+    PROFILE_SAMPLE_RATE: float = float(os.getenv('PROFILE_SAMPLE_RATE', '1.0'))
+    PROFILE_INTERVAL_MS: float = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+    PROFILE_BUFFER_SIZE: int = int(os.getenv('PROFILE_BUFFER_SIZE', '50'))
+    # Bulk creation: concurrent upstream calls per batch and calls per second per advertiser
+    BULK_CONCURRENCY: int = int(os.getenv('BULK_CONCURRENCY', '5'))
+    BULK_RATE_LIMIT_PER_SEC: float = float(os.getenv('BULK_RATE_LIMIT_PER_SEC', '10'))
+    BULK_MAX_ITEMS: int = int(os.getenv('BULK_MAX_ITEMS', '1000'))
+    # Background ad creation jobs (uploads are spooled to JOB_SPOOL_DIR, default: system temp dir)
+    JOB_WORKERS: int = int(os.getenv('JOB_WORKERS', '2'))
+    JOB_SPOOL_DIR: str = os.getenv('JOB_SPOOL_DIR', '')
+    JOB_LEASE_SECONDS: int = int(os.getenv('JOB_LEASE_SECONDS', '600'))
+    JOB_TTL_SECONDS: int = int(os.getenv('JOB_TTL_SECONDS', '86400'))
+    # Load heavy subsystems (OpenCV, fuzzy ranking) at startup instead of on first use
+    WARMUP_ON_STARTUP: bool = os.getenv('WARMUP_ON_STARTUP', 'false').lower() in ('1', 'true', 'yes')
+    # Incremental ranking sessions kept in memory (least recently used are dropped first)
+    RANKING_SESSION_MAX: int = int(os.getenv('RANKING_SESSION_MAX', '100'))
+    RANKING_SESSION_TTL_SECONDS: int = int(os.getenv('RANKING_SESSION_TTL_SECONDS', '3600'))
 
     class Config:
         env_file = ".env"
\ No newline at end of file
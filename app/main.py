@@ -1,10 +1,14 @@
-from fastapi import FastAPI, Request, Depends, Form, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse, RedirectResponse, FileResponse, HTMLResponse
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Request, Depends, Form, UploadFile, File, HTTPException, Header
+from fastapi.responses import JSONResponse, RedirectResponse, FileResponse, HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 import socketio
 from typing import Optional, Dict, Any, List
+import asyncio
 import json
 import urllib.parse
 from datetime import datetime
@@ -15,8 +19,14 @@ from app.config import Settings
 from app.utils.auth_utils import generate_csrf_state, get_latest_token
 from app.utils.api_utils import make_api_request
 from app.utils.file_utils import upload_video, upload_image, get_identity
-from app.utils.fuzzy_logic import FuzzyRanking
-from app.models import FuzzyRankingRequest, FuzzyRankingResponse, RankedAdItem
+from app.utils.metrics import MetricsMiddleware, SOCKETIO_CONNECTIONS, render_metrics, record_ranking
+from app.utils.profiling import ProfilingMiddleware, span, to_thread, get_profiles, get_profile, is_admin_token
+from app.utils.bulk_utils import rate_limiter, run_bulk, bulk_response
+from app.utils.job_queue import Job, JobQueue, JobFailed, new_job_id
+from app.utils.lazy import LazySubsystem, warm_up, startup_report, record_app_import
+from app.utils.report_utils import fetch_report, fetch_daily_report, fetch_details, report_to_items, LEVELS
+from app.utils.drilldown import build_ranked_tree
+from app.models import FuzzyRankingRequest, FuzzyRankingResponse, RankedAdItem, BulkCreateRequest, RankingDeltaRequest, WhatIfRequest
 
 # Load environment variables
 settings = Settings()
@@ -33,6 +43,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profile requests that opt in with the admin token (see /admin/profiles)
+app.add_middleware(ProfilingMiddleware)
+
+# Record per-route latency and in-flight requests for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Find the absolute path to the static directory
 BASE_PATH = Path(__file__).resolve().parent
 STATIC_PATH = BASE_PATH / "static"
@@ -44,18 +60,35 @@ app.mount("/socket.io", socket_app)
 
 @sio.event
 async def connect(sid, environ):
+    SOCKETIO_CONNECTIONS.inc()
     print('Client connected', sid)
 
 @sio.event
 async def disconnect(sid):
+    SOCKETIO_CONNECTIONS.dec()
     print('Client disconnected', sid)
 
+@sio.event
+async def watch_job(sid, data):
+    """Subscribe a client to `job_progress` events of one job and send its current state."""
+    job_id = (data or {}).get('job_id')
+    if not job_id:
+        return
+    await sio.enter_room(sid, f"job:{job_id}")
+    state = ad_jobs.get(job_id)
+    if state:
+        await sio.emit('job_progress', state, to=sid)
+
 # Setup static files and templates
 app.mount("/static", StaticFiles(directory=str(STATIC_PATH)), name="static")
 templates = Jinja2Templates(directory=str(BASE_PATH / "templates"))
 
-# Initialize FuzzyRanking
-fuzzy_ranking = FuzzyRanking()
+# FuzzyRanking pulls in numpy, pandas, scikit-learn and scikit-fuzzy, so build it on first use
+def load_fuzzy_ranking():
+    from app.utils.fuzzy_logic import FuzzyRanking
+    return FuzzyRanking()
+
+fuzzy_ranking = LazySubsystem("fuzzy_ranking", load_fuzzy_ranking)
 
 # Routes
 @app.get("/")
@@ -98,14 +131,17 @@ async def callback(data: Dict[str, str]):
         raise HTTPException(status_code=400, detail="Invalid state or missing code")
 
     token_data = {'secret': settings.SECRET, 'app_id': settings.APP_ID, 'auth_code': auth_code}
-    token_response, error = await make_api_request(f"{settings.API_URL}/oauth2/access_token/", json_data=token_data, method='POST')
+    with span("token_exchange"):
+        token_response, error = await make_api_request(f"{settings.API_URL}/oauth2/access_token/", json_data=token_data, method='POST')
     if error:
         raise HTTPException(status_code=400, detail=f"Failed to get access token: {error}")
 
     access_token = token_response['data']['access_token']
     from app.utils.auth_utils import redis_client
-    redis_client.set(f'access_token:{state}', access_token)
-    await sio.emit('token_update', {'access_token': access_token})
+    with span("store_token"):
+        redis_client.set(f'access_token:{state}', access_token)
+    with span("emit_token"):
+        await sio.emit('token_update', {'access_token': access_token})
     return {"success": True}
 
 @app.get("/get_advertiser")
@@ -116,7 +152,8 @@ async def get_advertiser():
 
     advertiser_url = f"{settings.API_URL}/oauth2/advertiser/get/?secret={settings.SECRET}&app_id={settings.APP_ID}"
     headers = {'Access-Token': access_token}
-    advertiser_response, error = await make_api_request(advertiser_url, headers=headers)
+    with span("advertiser_list"):
+        advertiser_response, error = await make_api_request(advertiser_url, headers=headers)
     if error:
         raise HTTPException(status_code=400, detail=f"Failed to get advertiser: {error}")
 
@@ -125,28 +162,82 @@ async def get_advertiser():
         return {"advertiser_ids": None}
 
     info_url = f"{settings.API_URL}/advertiser/info/?advertiser_ids={json.dumps(advertiser_ids)}"
-    info_response, error = await make_api_request(info_url, headers=headers)
+    with span("advertiser_info"):
+        info_response, error = await make_api_request(info_url, headers=headers)
     if error:
         raise HTTPException(status_code=400, detail=f"Failed to get advertiser info: {error}")
 
     filtered_data = [{'id': item['advertiser_id'], 'name': item['name']} for item in info_response['data']['list']]
     return {"message": "OK", "data": filtered_data}
 
-@app.post("/campaign")
-async def create_campaign(data: Dict[str, Any]):
-    campaign_data = {
+def build_campaign_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
         'advertiser_id': settings.ADVERTISER_ID_SB,
         'campaign_name': data.get('campaign_name'),
         'objective_type': 'TRAFFIC',
         'budget_mode': 'BUDGET_MODE_TOTAL',
         'budget': data.get('campaign_budget')
     }
-    campaign_response, error = await make_api_request(
-        f"{settings.API_URL_SB}/campaign/create/", 
-        headers={'Access-Token': settings.ACCESS_TOKEN_SB}, 
-        json_data=campaign_data, 
+
+def build_ad_group_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'advertiser_id': settings.ADVERTISER_ID_SB,
+        'campaign_id': data.get('campaign_id'),
+        'adgroup_name': data.get('ad_group_name'),
+        'promotion_type': 'WEBSITE',
+        'placement_type': 'PLACEMENT_TYPE_NORMAL',
+        'placements': ['PLACEMENT_TIKTOK'],
+        'location_ids': ['3932488'],
+        'gender': 'GENDER_UNLIMITED',
+        'operating_systems': ['ANDROID'],
+        'budget_mode': 'BUDGET_MODE_DAY',
+        'budget': data.get('ad_group_budget'),
+        'schedule_type': 'SCHEDULE_FROM_NOW',
+        'schedule_start_time': f'{datetime.now()}',
+        'optimization_goal': 'CLICK',
+        'bid_type': 'BID_TYPE_NO_BID',
+        'billing_event': 'CPC',
+        'pacing': 'PACING_MODE_SMOOTH',
+        'operation_status': 'ENABLE'
+    }
+
+def build_creative(ad_name: str, identity_id: str, video_id: str, image_id: str, spec: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    spec = spec or {}
+    return {
+        'ad_name': ad_name,
+        'identity_type': 'TT_USER',
+        'identity_id': identity_id,
+        'ad_format': 'SINGLE_VIDEO',
+        'video_id': video_id,
+        'image_ids': [image_id],
+        'ad_text': spec.get('ad_text', 'Check out our new product!'),
+        'call_to_action': spec.get('call_to_action', 'LEARN_MORE'),
+        'landing_page_url': spec.get('landing_page_url', 'https://example.com')
+    }
+
+async def create_entity(endpoint: str, payload: Dict[str, Any], id_key: str) -> Dict[str, Any]:
+    """Create one entity upstream for a bulk request, respecting the per-advertiser rate limit."""
+    await rate_limiter.acquire(settings.ADVERTISER_ID_SB)
+    response, error = await make_api_request(
+        f"{settings.API_URL_SB}{endpoint}",
+        headers={'Access-Token': settings.ACCESS_TOKEN_SB},
+        json_data=payload,
         method='POST'
     )
+    if error:
+        return {"success": False, "message": error.get("message", str(error))}
+    return {"success": True, id_key: response.get('data', {}).get(id_key)}
+
+@app.post("/campaign")
+async def create_campaign(data: Dict[str, Any]):
+    campaign_data = build_campaign_data(data)
+    with span("upstream_create"):
+        campaign_response, error = await make_api_request(
+            f"{settings.API_URL_SB}/campaign/create/", 
+            headers={'Access-Token': settings.ACCESS_TOKEN_SB}, 
+            json_data=campaign_data, 
+            method='POST'
+        )
     if error:
         # Return a JSON response with the error instead of raising an HTTPException
         return JSONResponse(
@@ -158,10 +249,11 @@ async def create_campaign(data: Dict[str, Any]):
 @app.get("/campaign")
 async def get_campaigns():
     campaign_url = f"{settings.API_URL_SB}/campaign/get/?advertiser_id={settings.ADVERTISER_ID_SB}"
-    campaign_response, error = await make_api_request(
-        campaign_url, 
-        headers={'Access-Token': settings.ACCESS_TOKEN_SB}
-    )
+    with span("upstream_list"):
+        campaign_response, error = await make_api_request(
+            campaign_url, 
+            headers={'Access-Token': settings.ACCESS_TOKEN_SB}
+        )
     if error:
         raise HTTPException(status_code=400, detail=error)
     filtered_data = [
@@ -175,34 +267,30 @@ async def get_campaigns():
     ]
     return {"message": "OK", "data": filtered_data}
 
+@app.post("/campaign/batch")
+async def create_campaigns_batch(request: BulkCreateRequest, stream: bool = False):
+    """
+    Endpoint untuk membuat banyak campaign sekaligus (item sama seperti POST /campaign)
+    """
+    if len(request.items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {settings.BULK_MAX_ITEMS})")
+    results = run_bulk(
+        request.items,
+        lambda item: create_entity("/campaign/create/", build_campaign_data(item), 'campaign_id'),
+        request.concurrency or settings.BULK_CONCURRENCY
+    )
+    return await bulk_response(results, len(request.items), stream)
+
 @app.post("/ad_group")
 async def create_ad_group(data: Dict[str, Any]):
-    ad_group_data = {
-        'advertiser_id': settings.ADVERTISER_ID_SB,
-        'campaign_id': data.get('campaign_id'),
-        'adgroup_name': data.get('ad_group_name'),
-        'promotion_type': 'WEBSITE',
-        'placement_type': 'PLACEMENT_TYPE_NORMAL',
-        'placements': ['PLACEMENT_TIKTOK'],
-        'location_ids': ['3932488'],
-        'gender': 'GENDER_UNLIMITED',
-        'operating_systems': ['ANDROID'],
-        'budget_mode': 'BUDGET_MODE_DAY',
-        'budget': data.get('ad_group_budget'),
-        'schedule_type': 'SCHEDULE_FROM_NOW',
-        'schedule_start_time': f'{datetime.now()}',
-        'optimization_goal': 'CLICK',
-        'bid_type': 'BID_TYPE_NO_BID',
-        'billing_event': 'CPC',
-        'pacing': 'PACING_MODE_SMOOTH',
-        'operation_status': 'ENABLE'
-    }
-    ad_group_response, error = await make_api_request(
-        f"{settings.API_URL_SB}/adgroup/create/", 
-        headers={'Access-Token': settings.ACCESS_TOKEN_SB}, 
-        json_data=ad_group_data, 
-        method='POST'
-    )
+    ad_group_data = build_ad_group_data(data)
+    with span("upstream_create"):
+        ad_group_response, error = await make_api_request(
+            f"{settings.API_URL_SB}/adgroup/create/", 
+            headers={'Access-Token': settings.ACCESS_TOKEN_SB}, 
+            json_data=ad_group_data, 
+            method='POST'
+        )
     if error:
         return JSONResponse(
             status_code=400,
@@ -216,10 +304,11 @@ async def get_ad_groups(filtering: Optional[str] = None):
     if filtering:
         ad_group_url += f"&filtering={filtering}"
     
-    ad_group_response, error = await make_api_request(
-        ad_group_url, 
-        headers={'Access-Token': settings.ACCESS_TOKEN_SB}
-    )
+    with span("upstream_list"):
+        ad_group_response, error = await make_api_request(
+            ad_group_url, 
+            headers={'Access-Token': settings.ACCESS_TOKEN_SB}
+        )
     if error:
         raise HTTPException(status_code=400, detail=error)
     
@@ -235,6 +324,111 @@ async def get_ad_groups(filtering: Optional[str] = None):
     ]
     return {"message": "OK", "data": filtered_data}
 
+@app.post("/ad_group/batch")
+async def create_ad_groups_batch(request: BulkCreateRequest, stream: bool = False):
+    """
+    Endpoint untuk membuat banyak ad group sekaligus (item sama seperti POST /ad_group)
+    """
+    if len(request.items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {settings.BULK_MAX_ITEMS})")
+    results = run_bulk(
+        request.items,
+        lambda item: create_entity("/adgroup/create/", build_ad_group_data(item), 'adgroup_id'),
+        request.concurrency or settings.BULK_CONCURRENCY
+    )
+    return await bulk_response(results, len(request.items), stream)
+
+async def run_ad_pipeline(
+    ad_group_id: str,
+    ad_name: str,
+    file_content: bytes,
+    filename: str,
+    state: Optional[Dict[str, str]] = None,
+    progress=None
+) -> Dict[str, Any]:
+    """
+    Upload thumbnail dan video, ambil identity, lalu buat iklan. Hasil tiap tahap yang sudah ada
+    di `state` (image_id, video_id, identity_id) dilewati, sehingga job yang diulang bisa melanjutkan.
+    Gagal dengan JobFailed(message, stage).
+    """
+    state = dict(state or {})
+
+    async def report(stage: str, percent: int, **results: Any) -> None:
+        state.update(results)
+        if progress:
+            await progress(stage, percent, **results)
+
+    # Upload image and video
+    if not state.get('image_id'):
+        await report("upload_image", 10)
+        with span("upload_image"):
+            image_id, error = await upload_image(settings.ADVERTISER_ID_SB, file_content, filename)
+        if error:
+            raise JobFailed(error, "upload_image")
+        await report("upload_image", 35, image_id=image_id)
+
+    if not state.get('video_id'):
+        await report("upload_video", 40)
+        with span("upload_video"):
+            video_id, error = await upload_video(settings.ADVERTISER_ID_SB, file_content, filename)
+        if error:
+            raise JobFailed(error, "upload_video")
+        await report("upload_video", 75, video_id=video_id)
+
+    if not state.get('identity_id'):
+        with span("identity"):
+            identity_id, error = await get_identity(settings.ADVERTISER_ID_SB)
+        if error:
+            raise JobFailed(error, "identity")
+        await report("identity", 85, identity_id=identity_id)
+
+    ad_data = {
+        'advertiser_id': settings.ADVERTISER_ID_SB,
+        'adgroup_id': ad_group_id,
+        'creatives': [build_creative(ad_name, state['identity_id'], state['video_id'], state['image_id'])]
+    }
+    
+    await report("create_ad", 90)
+    with span("upstream_create"):
+        ad_response, error = await make_api_request(
+            f"{settings.API_URL_SB}/ad/create/", 
+            headers={'Access-Token': settings.ACCESS_TOKEN_SB}, 
+            json_data=ad_data, 
+            method='POST'
+        )
+    if error:
+        raise JobFailed(error.get("message", str(error)), "create_ad")
+    
+    return {"ad_ids": ad_response.get('data', {}).get('ad_ids', [])}
+
+async def run_ad_job(job: Job) -> Dict[str, Any]:
+    with span("read_upload"):
+        file_content = await to_thread(job.payload)
+    return await run_ad_pipeline(
+        job.fields['ad_group_id'], job.fields['ad_name'], file_content, job.fields['filename'],
+        state=job.fields, progress=job.progress
+    )
+
+async def emit_job_update(state: Dict[str, Any]) -> None:
+    await sio.emit('job_progress', state, room=f"job:{state['id']}")
+
+# Background ad creation jobs backed by Redis
+ad_jobs = JobQueue("ad", run_ad_job, on_update=emit_job_update)
+
+@app.on_event("startup")
+async def start_job_workers():
+    await ad_jobs.start()
+
+@app.on_event("startup")
+async def warm_up_subsystems():
+    if settings.WARMUP_ON_STARTUP:
+        # Load heavy subsystems before serving so the first requests don't pay for them
+        await to_thread(warm_up)
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await ad_jobs.stop()
+
 @app.post("/ad")
 async def create_ad(
     advertiser_id: str = Form(...),
@@ -244,51 +438,143 @@ async def create_ad(
     ad_file: UploadFile = File(...)
 ):
     # Read file content
-    file_content = await ad_file.read()
+    with span("read_upload"):
+        file_content = await ad_file.read()
     
-    # Upload image and video
-    image_id, error = await upload_image(settings.ADVERTISER_ID_SB, file_content, ad_file.filename)
-    if error:
-        raise HTTPException(status_code=400, detail=error)
-        
-    video_id, error = await upload_video(settings.ADVERTISER_ID_SB, file_content, ad_file.filename)
-    if error:
-        raise HTTPException(status_code=400, detail=error)
-        
-    identity_id, error = await get_identity(settings.ADVERTISER_ID_SB)
-    if error:
-        raise HTTPException(status_code=400, detail=error)
-        
-    ad_data = {
-        'advertiser_id': settings.ADVERTISER_ID_SB,
-        'adgroup_id': ad_group_id,
-        'creatives': [{
-            'ad_name': ad_name,
-            'identity_type': 'TT_USER',
-            'identity_id': identity_id,
-            'ad_format': 'SINGLE_VIDEO',
-            'video_id': video_id,
-            'image_ids': [image_id],
-            'ad_text': 'Check out our new product!',
-            'call_to_action': 'LEARN_MORE',
-            'landing_page_url': 'https://example.com'
-        }]
-    }
-    
-    ad_response, error = await make_api_request(
-        f"{settings.API_URL_SB}/ad/create/", 
-        headers={'Access-Token': settings.ACCESS_TOKEN_SB}, 
-        json_data=ad_data, 
-        method='POST'
-    )
-    if error:
-        return JSONResponse(
-            status_code=400,
-            content={"success": False, "message": error.get("message", str(error))}
-        )
+    try:
+        await run_ad_pipeline(ad_group_id, ad_name, file_content, ad_file.filename)
+    except JobFailed as e:
+        if e.stage == "create_ad":
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": str(e)}
+            )
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {"success": True}
 
+@app.post("/ad/jobs", status_code=202)
+async def create_ad_job(
+    advertiser_id: str = Form(...),
+    campaign_id: str = Form(...),
+    ad_group_id: str = Form(...),
+    ad_name: str = Form(...),
+    ad_file: UploadFile = File(...),
+    sid: Optional[str] = Form(None)
+):
+    """
+    Endpoint untuk membuat iklan sebagai job di background. Mengembalikan job_id segera;
+    progres dikirim lewat event Socket.IO `job_progress` (room `job:<job_id>`)
+    """
+    file_content = await ad_file.read()
+    fields = {
+        'advertiser_id': advertiser_id,
+        'campaign_id': campaign_id,
+        'ad_group_id': ad_group_id,
+        'ad_name': ad_name,
+        'filename': ad_file.filename
+    }
+    job_id = new_job_id()
+    if sid:
+        # Subscribe the submitting client before the first progress event can be emitted
+        try:
+            await sio.enter_room(sid, f"job:{job_id}")
+        except (KeyError, ValueError):
+            # Not (or no longer) connected; the client can still subscribe with `watch_job` or poll
+            print(f"Job {job_id}: unknown Socket.IO sid {sid}, not subscribed")
+    await to_thread(ad_jobs.enqueue, fields, file_content, job_id)
+    return {"success": True, "job_id": job_id}
+
+@app.get("/ad/jobs/{job_id}")
+async def get_ad_job(job_id: str):
+    state = await to_thread(ad_jobs.get, job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"message": "OK", "data": state}
+
+@app.post("/ad/batch")
+async def create_ads_batch(
+    specs: str = Form(..., description="JSON array: [{ad_group_id, creatives: [{ad_name, file, ad_text?, call_to_action?, landing_page_url?}]}]"),
+    files: List[UploadFile] = File(...),
+    concurrency: Optional[int] = Form(None, ge=1, le=50),
+    stream: bool = False
+):
+    """
+    Endpoint untuk membuat banyak iklan sekaligus; tiap iklan bisa memiliki beberapa creative
+    yang merujuk ke file video yang diunggah berdasarkan nama file
+    """
+    try:
+        ad_specs = json.loads(specs)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="specs must be a JSON array")
+    if not isinstance(ad_specs, list) or not all(
+        isinstance(spec, dict) and spec.get('ad_group_id') and isinstance(spec.get('creatives'), list) and spec['creatives']
+        and all(isinstance(creative, dict) and creative.get('file') for creative in spec['creatives'])
+        for spec in ad_specs
+    ):
+        raise HTTPException(status_code=400, detail="Each spec needs an ad_group_id and a non-empty creatives list with a file per creative")
+    if len(ad_specs) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Too many items (max {settings.BULK_MAX_ITEMS})")
+
+    filenames = [upload.filename for upload in files]
+    duplicates = sorted({filename for filename in filenames if filenames.count(filename) > 1})
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Uploaded files must have unique names: {duplicates}")
+
+    with span("read_upload"):
+        file_contents = {upload.filename: await upload.read() for upload in files}
+    referenced = {creative.get('file') for spec in ad_specs for creative in spec['creatives']}
+    missing = referenced - file_contents.keys()
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Creatives reference files that were not uploaded: {sorted(missing)}")
+
+    limit = concurrency or settings.BULK_CONCURRENCY
+
+    with span("identity"):
+        await rate_limiter.acquire(settings.ADVERTISER_ID_SB)
+        identity_id, error = await get_identity(settings.ADVERTISER_ID_SB)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    # Upload every referenced file once (thumbnail + video), shared by all creatives using it
+    async def upload_assets(filename: str) -> Dict[str, Any]:
+        await rate_limiter.acquire(settings.ADVERTISER_ID_SB)
+        image_id, error = await upload_image(settings.ADVERTISER_ID_SB, file_contents[filename], filename)
+        if error:
+            return {"success": False, "file": filename, "message": error}
+        await rate_limiter.acquire(settings.ADVERTISER_ID_SB)
+        video_id, error = await upload_video(settings.ADVERTISER_ID_SB, file_contents[filename], filename)
+        if error:
+            return {"success": False, "file": filename, "message": error}
+        return {"success": True, "file": filename, "image_id": image_id, "video_id": video_id}
+
+    filenames = sorted(referenced)
+    assets: Dict[str, Dict[str, Any]] = {}
+
+    async def create_one(spec: Dict[str, Any]) -> Dict[str, Any]:
+        failed = [assets[creative['file']] for creative in spec['creatives'] if not assets[creative['file']]["success"]]
+        if failed:
+            return {"success": False, "message": f"Upload failed for {failed[0]['file']}: {failed[0]['message']}"}
+        creatives = [
+            build_creative(creative.get('ad_name'), identity_id, assets[creative['file']]['video_id'], assets[creative['file']]['image_id'], creative)
+            for creative in spec['creatives']
+        ]
+        ad_data = {'advertiser_id': settings.ADVERTISER_ID_SB, 'adgroup_id': spec['ad_group_id'], 'creatives': creatives}
+        return await create_entity("/ad/create/", ad_data, 'ad_ids')
+
+    async def upload_then_create():
+        # Uploads run inside the response so a streamed batch reports each file as soon as it is uploaded
+        with span("upload_assets"):
+            async for result in run_bulk(filenames, upload_assets, limit):
+                # Map back by index: a result for an upload that raised has no "file" key
+                filename = filenames[result.pop("index")]
+                assets[filename] = {**result, "file": filename}
+                yield {"event": "upload", **assets[filename], "uploaded": len(assets), "files": len(filenames)}
+        async for result in run_bulk(ad_specs, create_one, limit):
+            yield result
+
+    return await bulk_response(upload_then_create(), len(ad_specs), stream)
+
 @app.get("/report/{type}")
 async def get_report(
     type: str,
@@ -327,7 +613,8 @@ async def get_report(
         
     config = type_config[type]
     detail_url = f"{settings.API_URL}{config['detail_endpoint']}?advertiser_id={advertiser_id}&fields={json.dumps(config['detail_fields'])}&page_size=1000"
-    detail_response, error = await make_api_request(detail_url, headers={'Access-Token': access_token})
+    with span("upstream_detail"):
+        detail_response, error = await make_api_request(detail_url, headers={'Access-Token': access_token})
     
     if error:
         raise HTTPException(status_code=400, detail=error)
@@ -347,17 +634,19 @@ async def get_report(
     # Add pagination
     report_url += "&page_size=1000"
     
-    report_response, error = await make_api_request(report_url, headers={'Access-Token': access_token})
+    with span("upstream_report"):
+        report_response, error = await make_api_request(report_url, headers={'Access-Token': access_token})
     
     if error:
         raise HTTPException(status_code=400, detail=error)
         
-    detail_dict = {item[config['report_dimension']]: item for item in detail_response['data']['list']}
-    merged_data = [
-        {**report_item['dimensions'], **report_item['metrics'], **detail_dict[report_item['dimensions'][config['report_dimension']]]}
-        for report_item in report_response['data']['list']
-        if report_item['dimensions'][config['report_dimension']] in detail_dict
-    ]
+    with span("merge"):
+        detail_dict = {item[config['report_dimension']]: item for item in detail_response['data']['list']}
+        merged_data = [
+            {**report_item['dimensions'], **report_item['metrics'], **detail_dict[report_item['dimensions'][config['report_dimension']]]}
+            for report_item in report_response['data']['list']
+            if report_item['dimensions'][config['report_dimension']] in detail_dict
+        ]
     
     # Include date range info in the response
     response_data = {
@@ -370,7 +659,8 @@ async def get_report(
         'data': merged_data
     }
     
-    return response_data
+    with span("serialize"):
+        return JSONResponse(content=response_data)
 
 @app.post("/rank-ads", response_model=FuzzyRankingResponse)
 async def rank_ads(request: FuzzyRankingRequest):
@@ -388,8 +678,10 @@ async def rank_ads(request: FuzzyRankingRequest):
             } for item in request.ads
         ]
         
-        # Proses ranking
-        ranked_data = fuzzy_ranking.rank_ads(data)
+        # Proses ranking; pemuatan pertama fuzzy engine (pandas, sklearn, skfuzzy) tidak boleh memblokir event loop
+        ranker = await to_thread(fuzzy_ranking.get)
+        with span("ranking"):
+            ranked_data = ranker.rank_ads(data)
         
         # Konversi hasil ke format yang diinginkan
         result = {
@@ -411,11 +703,210 @@ async def rank_ads(request: FuzzyRankingRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error ranking ads: {str(e)}")
 
+@app.put("/rank-ads/sessions/{session_key}")
+async def load_ranking_session(session_key: str, request: FuzzyRankingRequest):
+    """
+    Buat (atau ganti) sesi ranking untuk satu advertiser/campaign dan ranking semua iklan.
+    Perubahan berikutnya cukup dikirim lewat PATCH dengan delta saja
+    """
+    from app.utils.ranking_session import sessions
+
+    items = [item.model_dump() for item in request.ads]
+
+    def load():
+        session = sessions.create(session_key, fuzzy_ranking.get().compute_rankings)
+        with session.lock:
+            started = time.perf_counter()
+            ranked = session.load(items)
+            record_ranking(len(ranked), time.perf_counter() - started)
+            return session.version, ranked
+
+    with span("ranking"):
+        version, ranked = await to_thread(load)
+    return {"session": session_key, "version": version, "ranked_ads": ranked}
+
+@app.patch("/rank-ads/sessions/{session_key}")
+async def update_ranking_session(session_key: str, request: RankingDeltaRequest):
+    """
+    Terapkan delta (changed, added, removed) ke sesi ranking. Hanya iklan yang berubah yang dihitung
+    ulang, kecuali min/max suatu kolom bergeser; respons berisi diff ranking
+    """
+    from app.utils.ranking_session import sessions, VersionConflict
+
+    session = sessions.get(session_key)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Ranking session not found")
+
+    def apply():
+        with session.lock:
+            started = time.perf_counter()
+            result = session.apply(
+                changed=[item.model_dump() for item in request.changed],
+                added=[item.model_dump() for item in request.added],
+                removed=request.removed,
+                base_version=request.base_version,
+            )
+            # Hanya baris yang dihitung ulang yang masuk histogram per baris
+            record_ranking(result["rescored"], time.perf_counter() - started)
+            return result
+
+    try:
+        with span("ranking"):
+            return await to_thread(apply)
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/rank-ads/sessions/{session_key}")
+async def get_ranking_session(session_key: str):
+    """
+    Ranking lengkap sesi saat ini (untuk sinkron ulang klien)
+    """
+    from app.utils.ranking_session import sessions
+
+    session = sessions.get(session_key)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Ranking session not found")
+
+    def snapshot():
+        with session.lock:
+            return {"session": session_key, "version": session.version, "ranked_ads": session.ranked()}
+
+    return await to_thread(snapshot)
+
+@app.delete("/rank-ads/sessions/{session_key}")
+async def delete_ranking_session(session_key: str):
+    from app.utils.ranking_session import sessions
+
+    if not sessions.delete(session_key):
+        raise HTTPException(status_code=404, detail="Ranking session not found")
+    return {"success": True}
+
+@app.get("/rank-ads/what-if")
+async def what_if_config():
+    """
+    Konfigurasi produksi (parameter membership dan tabel rule) sebagai titik awal varian what-if
+    """
+    from app.utils.fuzzy_logic import MEMBERSHIP_PARAMS
+
+    ranker = await to_thread(fuzzy_ranking.get)
+    return {"membership": MEMBERSHIP_PARAMS, "rules": ranker.rule_table()}
+
+@app.post("/rank-ads/what-if")
+async def what_if_ranking(request: WhatIfRequest):
+    """
+    Ranking iklan yang sama dengan beberapa konfigurasi fuzzy alternatif sekaligus dan bandingkan
+    dengan konfigurasi produksi (Spearman, Kendall tau, top-k overlap, pergeseran ranking)
+    """
+    from app.utils.whatif import ordinal_ranks, compare_rankings
+
+    ads = [item.model_dump() for item in request.ads]
+    names = [ad["name"] for ad in ads]
+
+    def compute():
+        ranker = fuzzy_ranking.get()
+        # Varian dibangun dulu supaya parameter yang salah ditolak sebelum ada perhitungan
+        variants = [ranker.variant()] + [ranker.variant(variant.membership, variant.rules) for variant in request.variants]
+        started = time.perf_counter()
+        # Normalisasi sekali, dipakai bersama oleh semua varian
+        normalized, _ = ranker.normalize_data(ads)
+        scores = ranker.compute_variant_rankings(
+            [row["cost_norm"] for row in normalized],
+            [row["clicks_norm"] for row in normalized],
+            [row["impressions_norm"] for row in normalized],
+            variants,
+        )
+        # Setiap iklan dihitung sekali per varian
+        record_ranking(scores.size, time.perf_counter() - started)
+        return scores, ordinal_ranks(scores), compare_rankings(scores[0], scores[1:], request.top_k)
+
+    try:
+        with span("ranking"):
+            scores, ranks, stats = await to_thread(compute)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def ranked(variant: int, with_production: bool = True) -> List[Dict[str, Any]]:
+        order = sorted(range(len(names)), key=lambda row: ranks[variant][row])[:request.limit]
+        return [
+            {"name": names[row], "ranking": float(scores[variant][row]), "rank": int(ranks[variant][row]),
+             **({"production_rank": int(ranks[0][row])} if with_production else {})}
+            for row in order
+        ]
+
+    return {
+        "success": True,
+        "count": len(names),
+        "top_k": min(request.top_k, len(names)),
+        "production": {"ranked_ads": ranked(0, with_production=False)},
+        "variants": [
+            {"name": variant.name, **stats[position], "ranked_ads": ranked(position + 1)}
+            for position, variant in enumerate(request.variants)
+        ]
+    }
+
+async def analyze_drilldown(access_token: str, advertiser_id: str, campaign_id: Optional[str], normalization: str):
+    """
+    Ambil laporan campaign, ad group, dan ad beserta detailnya secara paralel, lalu ranking
+    setiap level dan susun menjadi tree campaign -> ad group -> ad
+    """
+    filtering = {"campaign_ids": [campaign_id]} if campaign_id else None
+    with span("upstream_reports"):
+        results = await asyncio.gather(
+            fetch_report(access_token, advertiser_id, "campaign", filtering=filtering),
+            fetch_report(access_token, advertiser_id, "adgroup", filtering=filtering),
+            fetch_report(access_token, advertiser_id, "ad", filtering=filtering),
+            fetch_details(access_token, advertiser_id, "campaign", filtering=filtering),
+            fetch_details(access_token, advertiser_id, "adgroup", filtering=filtering),
+            fetch_details(access_token, advertiser_id, "ad", filtering=filtering),
+        )
+    for _, error in results:
+        if error:
+            return JSONResponse(
+                status_code=400,
+                content={"success": False, "message": f"Failed to get report: {error}"}
+            )
+    (campaign_rows, _), (adgroup_rows, _), (ad_rows, _), (campaign_details, _), (adgroup_details, _), (ad_details, _) = results
+
+    with span("extract"):
+        campaign_names = {item['campaign_id']: item.get('campaign_name') for item in campaign_details}
+        adgroup_info = {item['adgroup_id']: item for item in adgroup_details}
+        ad_info = {item['ad_id']: item for item in ad_details}
+
+        campaigns = report_to_items(campaign_rows, "campaign_id")
+        for item in campaigns:
+            item["label"] = campaign_names.get(item["name"])
+        adgroups = report_to_items(adgroup_rows, "adgroup_id")
+        for item in adgroups:
+            info = adgroup_info.get(item["name"], {})
+            item["label"], item["parent_id"] = info.get("adgroup_name"), info.get("campaign_id")
+        ads = report_to_items(ad_rows, "ad_id")
+        for item in ads:
+            info = ad_info.get(item["name"], {})
+            item["label"], item["parent_id"] = info.get("ad_name"), info.get("adgroup_id")
+
+    ranker = await to_thread(fuzzy_ranking.get)
+    with span("ranking"):
+        result = build_ranked_tree(ranker.rank_ads, campaigns, adgroups, ads, normalization)
+
+    return {
+        "success": True,
+        "level": "drilldown",
+        "campaign_id": campaign_id,
+        "normalization": normalization,
+        **result
+    }
+
 @app.post("/analyze-campaign")
-async def analyze_campaign(advertiser_id: str, campaign_id: Optional[str] = None):
+async def analyze_campaign(advertiser_id: str, campaign_id: Optional[str] = None, mode: str = "flat", normalization: str = "parent"):
     """
-    Endpoint untuk menganalisis performa kampanye menggunakan logika fuzzy
+    Endpoint untuk menganalisis performa kampanye menggunakan logika fuzzy.
+    mode=drilldown meranking campaign, ad group, dan ad sekaligus dalam satu tree;
+    normalization=parent (per induk) atau global (per level)
     """
+    if mode not in ("flat", "drilldown"):
+        raise HTTPException(status_code=400, detail="mode must be 'flat' or 'drilldown'")
+    if normalization not in ("parent", "global"):
+        raise HTTPException(status_code=400, detail="normalization must be 'parent' or 'global'")
     try:
         # Dapatkan data laporan dari API TikTok
         access_token = get_latest_token()
@@ -425,6 +916,9 @@ async def analyze_campaign(advertiser_id: str, campaign_id: Optional[str] = None
                 content={"success": False, "message": "No access token found"}
             )
         
+        if mode == "drilldown":
+            return await analyze_drilldown(access_token, advertiser_id, campaign_id, normalization)
+        
         # Tentukan level data yang akan dianalisis
         level = "ad" if campaign_id else "campaign"
         
@@ -461,7 +955,8 @@ async def analyze_campaign(advertiser_id: str, campaign_id: Optional[str] = None
         print(f"DEBUG - Report URL: {final_url}")
         
         # Dapatkan laporan dari API TikTok
-        report_response, error = await make_api_request(final_url, headers={'Access-Token': access_token})
+        with span("upstream_report"):
+            report_response, error = await make_api_request(final_url, headers={'Access-Token': access_token})
         if error:
             return JSONResponse(
                 status_code=400,
@@ -483,7 +978,9 @@ async def analyze_campaign(advertiser_id: str, campaign_id: Optional[str] = None
             items.append(ad_data)
         
         # Proses ranking dengan fuzzy logic
-        ranked_items = fuzzy_ranking.rank_ads(items)
+        ranker = await to_thread(fuzzy_ranking.get)
+        with span("ranking"):
+            ranked_items = ranker.rank_ads(items)
         
         # Return hasil ranking
         return {
@@ -499,8 +996,130 @@ async def analyze_campaign(advertiser_id: str, campaign_id: Optional[str] = None
             content={"success": False, "message": f"Error analyzing campaign: {str(e)}", "traceback": traceback.format_exc()}
         )
 
+@app.post("/analyze-timeseries")
+async def analyze_timeseries(
+    advertiser_id: str,
+    start_date: str,
+    end_date: str,
+    level: str = "ad",
+    campaign_id: Optional[str] = None,
+    window: int = 7,
+    include_daily: bool = True,
+):
+    """
+    Endpoint untuk melihat tren ranking fuzzy per hari (stat_time_day).
+    Semua kombinasi entitas x hari diranking dalam satu batch; hasilnya skor harian,
+    rata-rata bergulir (window hari), slope tren, dan ranking hari terakhir
+    """
+    # numpy hanya dimuat saat endpoint ini dipakai
+    from app.utils.timeseries import MAX_DAYS, days_between, build_daily_matrix, rank_timeseries
+
+    if level not in LEVELS:
+        raise HTTPException(status_code=400, detail="level must be 'campaign', 'adgroup' or 'ad'")
+    if window < 1:
+        raise HTTPException(status_code=400, detail="window must be at least 1")
+    try:
+        days = days_between(start_date, end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be YYYY-MM-DD")
+    if not days or len(days) > MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"date range must cover 1 to {MAX_DAYS} days")
+
+    access_token = get_latest_token()
+    if not access_token:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": "No access token found"}
+        )
+
+    filtering = {"campaign_ids": [campaign_id]} if campaign_id else None
+    with span("upstream_reports"):
+        (rows, error), (details, details_error) = await asyncio.gather(
+            fetch_daily_report(access_token, advertiser_id, level, start_date, end_date, filtering=filtering),
+            fetch_details(access_token, advertiser_id, level, filtering=filtering),
+        )
+    if error:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "message": f"Failed to get report: {error}"}
+        )
+
+    dimension = LEVELS[level]["dimension"]
+    # Nama entitas hanya pelengkap; laporan tetap dikembalikan walau detail gagal diambil
+    labels = {item[dimension]: item.get(f"{level}_name") for item in details or []}
+
+    def compute():
+        ranker = fuzzy_ranking.get()
+        entity_ids, values = build_daily_matrix(rows, dimension, days)
+        started = time.perf_counter()
+        items = rank_timeseries(ranker.compute_rankings, entity_ids, days, values, window, include_daily, labels)
+        # Setiap kombinasi entitas x hari adalah satu baris fuzzy
+        record_ranking(len(entity_ids) * len(days), time.perf_counter() - started)
+        return items
+
+    with span("ranking"):
+        items = await to_thread(compute)
+
+    return {
+        "success": True,
+        "level": level,
+        "campaign_id": campaign_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": days,
+        "window": min(window, len(days)),
+        "items": items
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Endpoint metrik dalam format Prometheus
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """
+    Endpoint admin untuk melihat daftar profil request yang tersimpan
+    """
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    return {"message": "OK", "data": get_profiles()}
+
+@app.get("/admin/profiles/{profile_id}")
+async def read_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    """
+    Endpoint admin untuk melihat detail profil (span dan sampel stack) satu request
+    """
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {"message": "OK", "data": profile}
+
+@app.get("/admin/startup")
+async def read_startup_report(x_admin_token: Optional[str] = Header(None)):
+    """
+    Endpoint admin untuk melihat waktu import, memori, dan status subsistem yang dimuat lazily
+    """
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    return {"message": "OK", "data": startup_report()}
+
+@app.post("/admin/warmup")
+async def warm_up_route(x_admin_token: Optional[str] = Header(None)):
+    """
+    Endpoint admin untuk memuat semua subsistem berat sekarang (OpenCV, fuzzy ranking)
+    """
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    return {"message": "OK", "data": await to_thread(warm_up)}
+
 @app.get("/get_latest_token")
 async def get_latest_token_route():
     access_token = get_latest_token()
     return {"access_token": access_token}
 
+record_app_import(time.perf_counter() - _import_started)
\ No newline at end of file
@@ -21,4 +21,25 @@ class RankedAdItem(BaseModel):
     clicks_norm: Optional[float] = Field(None, description="Nilai clicks yang sudah dinormalisasi")
 
 class FuzzyRankingResponse(BaseModel):
-    ranked_ads: List[RankedAdItem] = Field(..., description="Daftar iklan yang sudah diranking")
\ No newline at end of file
+    ranked_ads: List[RankedAdItem] = Field(..., description="Daftar iklan yang sudah diranking")
+
+class BulkCreateRequest(BaseModel):
+    items: List[Dict[str, Any]] = Field(..., description="Daftar entitas yang akan dibuat (format sama dengan endpoint tunggal)")
+    concurrency: Optional[int] = Field(None, ge=1, le=50, description="Batas request paralel ke TikTok API (default BULK_CONCURRENCY)")
+
+class RankingDeltaRequest(BaseModel):
+    changed: List[AdItem] = Field(default_factory=list, description="Iklan yang metriknya berubah")
+    added: List[AdItem] = Field(default_factory=list, description="Iklan baru")
+    removed: List[str] = Field(default_factory=list, description="Nama iklan yang dihapus")
+    base_version: Optional[int] = Field(None, description="Versi sesi yang dimiliki klien; ditolak (409) jika sudah berbeda")
+
+class RankingVariant(BaseModel):
+    name: str = Field(..., description="Nama varian")
+    membership: Optional[Dict[str, Dict[str, List[float]]]] = Field(None, description="Parameter trimf yang ditimpa: variabel -> term -> [a, b, c]")
+    rules: Optional[List[str]] = Field(None, description="Term output untuk setiap rule, urutan sesuai GET /rank-ads/what-if")
+
+class WhatIfRequest(BaseModel):
+    ads: List[AdItem] = Field(..., description="Daftar iklan yang akan diranking")
+    variants: List[RankingVariant] = Field(..., min_length=1, max_length=100, description="Konfigurasi alternatif yang dibandingkan dengan produksi")
+    top_k: int = Field(10, ge=1, description="Jumlah iklan teratas untuk top-k overlap")
+    limit: Optional[int] = Field(None, ge=1, description="Batasi jumlah iklan per ranking di respons (statistik tetap memakai semua iklan)")
@@ -114,9 +114,59 @@ document.getElementById("adForm").addEventListener("submit", function(event) {
     formData.append("ad_group_id", document.getElementById("adGroupSelectAd").value);
     formData.append("ad_name", document.getElementById("adName").value.trim());
     formData.append("ad_file", document.getElementById("adFile").files[0]);
-    submitForm('/ad', formData, false);
+    // socket.id is undefined while disconnected; the job is then followed by polling
+    if (socket.connected) formData.append("sid", socket.id);
+    submitAdJob(formData);
 });
 
+const jobPollIntervalMs = 5000;
+const jobWaitTimeoutMs = 15 * 60 * 1000;
+const jobStageLabels = { queued: 'Queued', upload_image: 'Uploading thumbnail', upload_video: 'Uploading video', identity: 'Fetching identity', create_ad: 'Creating ad' };
+
+async function submitAdJob(formData) {
+    const loadingText = document.getElementById("loadingText");
+    document.getElementById("loadingOverlay").classList.remove("hidden");
+    try {
+        const response = await fetch('/ad/jobs', { method: "POST", body: formData });
+        const result = await response.json();
+        if (!result.success) throw new Error(result.message || result.detail || 'Failed to queue ad');
+        socket.emit('watch_job', { job_id: result.job_id });
+        const job = await new Promise(resolve => {
+            let poller, timeout;
+            const finish = state => {
+                socket.off('job_progress', onProgress);
+                clearInterval(poller);
+                clearTimeout(timeout);
+                resolve(state);
+            };
+            const onProgress = state => {
+                if (state.id !== result.job_id) return;
+                loadingText.innerText = `${jobStageLabels[state.stage] || state.stage} (${state.progress}%)`;
+                if (state.status === 'completed' || state.status === 'failed') finish(state);
+            };
+            socket.on('job_progress', onProgress);
+            // Fallback if the socket misses an event: poll the job state, and give up waiting after a while
+            poller = setInterval(async () => {
+                try {
+                    const response = await fetch(`/ad/jobs/${result.job_id}`);
+                    if (response.ok) onProgress((await response.json()).data);
+                } catch (error) {
+                    console.error("Error polling job:", error);
+                }
+            }, jobPollIntervalMs);
+            timeout = setTimeout(() => finish({ status: 'timeout' }), jobWaitTimeoutMs);
+        });
+        if (job.status === 'timeout') alert(`Ad is still being processed in the background (job ${result.job_id}).`);
+        else alert(job.status === 'completed' ? "Operation successful!" : "Failed: " + job.error);
+        if (job.status === 'completed') document.getElementById("adForm").reset();
+    } catch (error) {
+        alert("Error: " + error.message);
+    } finally {
+        loadingText.innerText = "Loading...";
+        document.getElementById("loadingOverlay").classList.add("hidden");
+    }
+}
+
 async function submitForm(url, data, isJson = true) {
     document.getElementById("loadingOverlay").classList.remove("hidden");
     try {
@@ -1,17 +1,24 @@
 import requests
 from typing import Dict, Any, Tuple, Optional
 
+from app.utils.metrics import upstream_call
+from app.utils.profiling import to_thread
+
 async def make_api_request(url: str, headers: Optional[Dict[str, str]] = None, json_data: Optional[Dict[str, Any]] = None, method: str = 'GET') -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
-    try:
-        if method == 'GET':
-            response = requests.get(url, headers=headers)
-        else:
-            response = requests.post(url, headers=headers, json=json_data)
-        
-        response_json = response.json()
-        if response_json.get('code') != 0:
-            return None, response_json
-        
-        return response_json, None
-    except Exception as e:
-        return None, {"error": str(e), "message": str(e)}
\ No newline at end of file
+    with upstream_call(url, method) as call:
+        try:
+            # Run the blocking HTTP call in a worker thread so concurrent requests don't stall the event loop
+            if method == 'GET':
+                response = await to_thread(requests.get, url, headers=headers)
+            else:
+                response = await to_thread(requests.post, url, headers=headers, json=json_data)
+            
+            # Same result codes as the file_utils helpers (http_<status> for non-200, e.g. an HTML 502)
+            call.record(response)
+            response_json = response.json()
+            if response_json.get('code') != 0:
+                return None, response_json
+            
+            return response_json, None
+        except Exception as e:
+            return None, {"error": str(e), "message": str(e)}
\ No newline at end of file
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from app.config import Settings
+
+settings = Settings()
+
+
+class RateLimiter:
+    """Token bucket per key (advertiser), shared by every batch running in this process."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self._buckets: Dict[str, List[float]] = {}
+
+    async def acquire(self, key: str) -> None:
+        """Wait until a call for `key` is allowed. A rate of 0 disables limiting."""
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = [tokens - 1, now]
+                return
+            self._buckets[key] = [tokens, now]
+            await asyncio.sleep((1 - tokens) / self.rate)
+
+
+rate_limiter = RateLimiter(settings.BULK_RATE_LIMIT_PER_SEC)
+
+
+async def run_bulk(
+    items: List[Any],
+    create_one: Callable[[Any], Awaitable[Dict[str, Any]]],
+    concurrency: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Run `create_one` for every item with at most `concurrency` in flight, yielding results as they complete.
+
+    Each result carries the item's `index` and a `success` flag; an exception fails only its own item.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(index: int, item: Any) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await create_one(item)
+            except Exception as e:
+                result = {"success": False, "message": str(e)}
+        return {"index": index, **result}
+
+    tasks = [asyncio.create_task(run(index, item)) for index, item in enumerate(items)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop outstanding work if the consumer goes away (e.g. the streaming client disconnects)
+        for task in tasks:
+            task.cancel()
+
+
+def _summary(results: List[Dict[str, Any]], total: int) -> Dict[str, Any]:
+    succeeded = sum(1 for result in results if result.get("success"))
+    return {"total": total, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+
+async def bulk_response(results: AsyncIterator[Dict[str, Any]], total: int, stream: bool = False):
+    """Turn bulk results into a response.
+
+    With `stream` the results are sent as NDJSON lines in completion order followed by a summary line;
+    otherwise a single JSON document lists them in request order. Items with an `event` key are progress
+    of a preparation phase (e.g. uploads before the creates): they are streamed as-is and not counted.
+    """
+    if stream:
+        async def lines():
+            completed = []
+            async for result in results:
+                if "event" in result:
+                    yield json.dumps(result) + "\n"
+                    continue
+                completed.append(result)
+                yield json.dumps({**result, "completed": len(completed), "total": total}) + "\n"
+            yield json.dumps({"done": True, **_summary(completed, total)}) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    completed = [result async for result in results if "event" not in result]
+    completed.sort(key=lambda result: result["index"])
+    summary = _summary(completed, total)
+    return {"success": summary["failed"] == 0, **summary, "results": completed}
@@ -0,0 +1,72 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+# Ranking function with the FuzzyRanking.rank_ads contract: items in, items sorted by `ranking` out
+Ranker = Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]
+
+NODE_FIELDS = ("cost", "impressions", "clicks", "ranking", "cost_norm", "impressions_norm", "clicks_norm")
+
+
+def _node(item: Dict[str, Any], rank: int) -> Dict[str, Any]:
+    node = {"id": item["name"], "name": item.get("label") or item["name"], "rank": rank}
+    node.update({field: item.get(field) for field in NODE_FIELDS})
+    if "global_rank" in item:
+        node["global_rank"] = item["global_rank"]
+    return node
+
+
+def _rank_level(ranker: Ranker, items: List[Dict[str, Any]], normalization: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Rank the items of one level and group them by `parent_id`, best first within each parent.
+
+    With 'parent' normalization every parent's children are normalized and ranked on their own;
+    with 'global' the whole level is ranked together and `global_rank` is kept on each item.
+    """
+    grouped: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    if normalization == "global":
+        for position, item in enumerate(ranker(items), start=1):
+            item["global_rank"] = position
+            grouped[item.get("parent_id")].append(item)
+        return grouped
+
+    by_parent: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for item in items:
+        by_parent[item.get("parent_id")].append(item)
+    for parent_id, children in by_parent.items():
+        grouped[parent_id] = ranker(children)
+    return grouped
+
+
+def build_ranked_tree(
+    ranker: Ranker,
+    campaigns: List[Dict[str, Any]],
+    adgroups: List[Dict[str, Any]],
+    ads: List[Dict[str, Any]],
+    normalization: str = "parent",
+) -> Dict[str, Any]:
+    """Rank campaigns, ad groups and ads and nest them as campaign -> ad groups -> ads.
+
+    Items use the ranking input format (`name` is the entity id) plus `parent_id` and an optional
+    display `label`. Children whose parent is not in the tree are counted as orphans.
+    """
+    ranked_campaigns = ranker(campaigns)
+    adgroups_by_campaign = _rank_level(ranker, adgroups, normalization)
+    ads_by_adgroup = _rank_level(ranker, ads, normalization)
+
+    tree = []
+    placed_adgroups = placed_ads = 0
+    for campaign_rank, campaign in enumerate(ranked_campaigns, start=1):
+        campaign_node = _node(campaign, campaign_rank)
+        campaign_node["ad_groups"] = []
+        for adgroup_rank, adgroup in enumerate(adgroups_by_campaign.get(campaign["name"], []), start=1):
+            adgroup_node = _node(adgroup, adgroup_rank)
+            adgroup_node["ads"] = [_node(ad, ad_rank) for ad_rank, ad in enumerate(ads_by_adgroup.get(adgroup["name"], []), start=1)]
+            placed_ads += len(adgroup_node["ads"])
+            campaign_node["ad_groups"].append(adgroup_node)
+        placed_adgroups += len(campaign_node["ad_groups"])
+        tree.append(campaign_node)
+
+    return {
+        "tree": tree,
+        "counts": {"campaigns": len(campaigns), "ad_groups": len(adgroups), "ads": len(ads)},
+        "orphans": {"ad_groups": len(adgroups) - placed_adgroups, "ads": len(ads) - placed_ads},
+    }
@@ -1,5 +1,5 @@
-import cv2
 import hashlib
+import importlib
 import tempfile
 import os
 import requests
@@ -8,11 +8,22 @@ from fastapi import UploadFile
 from typing import Tuple, Optional, Union, BinaryIO
 
 from app.config import Settings
+from app.utils.metrics import upstream_call
+from app.utils.profiling import span, to_thread
+from app.utils.lazy import LazySubsystem
 
 settings = Settings()
 
+# OpenCV is only needed for thumbnails, so load it on first use
+opencv = LazySubsystem("opencv", lambda: importlib.import_module("cv2"))
+
 async def get_thumbnail(file_content: bytes, filename: str) -> Tuple[Optional[BytesIO], Optional[str]]:
     """Extract a thumbnail from a video file."""
+    # Video decoding is CPU-bound, so keep it off the event loop
+    return await to_thread(_extract_thumbnail, file_content, filename)
+
+def _extract_thumbnail(file_content: bytes, filename: str) -> Tuple[Optional[BytesIO], Optional[str]]:
+    cv2 = opencv.get()
     with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_video:
         temp_video.write(file_content)
         temp_video_path = temp_video.name
@@ -69,7 +80,9 @@ async def upload_video(advertiser_id: str, file_content: bytes, filename: str) -
         'auto_bind_enabled': 'true'
     }
     
-    response = requests.post(url, headers=headers, files=files, data=data)
+    with upstream_call(url, 'POST') as call:
+        response = await to_thread(requests.post, url, headers=headers, files=files, data=data)
+        call.record(response)
     
     if response.status_code != 200:
         return None, f'Error: {response.status_code}, {response.text}'
@@ -83,7 +96,8 @@ async def upload_video(advertiser_id: str, file_content: bytes, filename: str) -
 async def upload_image(advertiser_id: str, file_content: bytes, filename: str) -> Tuple[Optional[str], Optional[str]]:
     """Upload an image (thumbnail) to the TikTok API."""
     # Extract thumbnail from video
-    file_obj, new_filename = await get_thumbnail(file_content, filename)
+    with span("thumbnail"):
+        file_obj, new_filename = await get_thumbnail(file_content, filename)
     
     if not file_obj:
         return None, 'Failed to extract thumbnail from video'
@@ -101,7 +115,9 @@ async def upload_image(advertiser_id: str, file_content: bytes, filename: str) -
         'image_signature': image_signature,
     }
     
-    response = requests.post(url, headers=headers, files=files, data=data)
+    with upstream_call(url, 'POST') as call:
+        response = await to_thread(requests.post, url, headers=headers, files=files, data=data)
+        call.record(response)
     
     if response.status_code != 200:
         return None, f'Error: {response.status_code}, {response.text}'
@@ -117,7 +133,9 @@ async def get_identity(advertiser_id: str) -> Tuple[Optional[str], Optional[str]
     url = f"{settings.API_URL_SB}/identity/get/?advertiser_id={advertiser_id}&identity_type=TT_USER"
     headers = {'Access-Token': settings.ACCESS_TOKEN_SB}
     
-    response = requests.get(url, headers=headers)
+    with upstream_call(url, 'GET') as call:
+        response = await to_thread(requests.get, url, headers=headers)
+        call.record(response)
     
     if response.status_code != 200:
         return None, f'Error: {response.status_code}, {response.text}'
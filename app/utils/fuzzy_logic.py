@@ -3,7 +3,192 @@ import pandas as pd
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
 from sklearn.preprocessing import MinMaxScaler
-from typing import Dict, List, Any, Tuple
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+from app.utils.metrics import record_ranking
+
+TERMS = ('low', 'medium', 'high')
+INPUTS = ('cost_norm', 'clicks_norm', 'impressions_norm')
+
+# Parameter trimf [a, b, c] tiap term; juga menjadi konfigurasi produksi untuk mode what-if
+MEMBERSHIP_PARAMS = {
+    # Cost membership functions
+    'cost_norm': {'low': [0, 0, 0.0543], 'medium': [0.0272, 0.0543, 0.2716], 'high': [0.0543, 1, 1]},
+    # Clicks membership functions
+    'clicks_norm': {'low': [0, 0, 0.0547], 'medium': [0.0273, 0.1823, 0.546], 'high': [0.1823, 1, 1]},
+    # Impressions membership functions
+    'impressions_norm': {'low': [0, 0, 0.0204], 'medium': [0.0204, 0.051, 0.102], 'high': [0.051, 1, 1]},
+    # Ranking output membership functions
+    'ranking': {'low': [0, 0, 0.5], 'medium': [0.25, 0.5, 0.75], 'high': [0.5, 1, 1]},
+}
+
+# Jumlah baris per batch pada evaluasi vektor; membatasi memori matriks agregasi (baris x universe)
+BATCH_ROWS = 1024
+
+
+def _centroid_weights(universe: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Bobot per titik universe sehingga luas dan momen fungsi linear per segmen = agg @ bobot"""
+    dx = np.diff(universe)
+    area = np.zeros_like(universe)
+    area[:-1] += dx / 2
+    area[1:] += dx / 2
+    moment = np.zeros_like(universe)
+    moment[:-1] += dx * (2 * universe[:-1] + universe[1:]) / 6
+    moment[1:] += dx * (universe[:-1] + 2 * universe[1:]) / 6
+    return area, moment
+
+
+def fuzzy_scores(
+    values: np.ndarray,
+    input_mfs: List[np.ndarray],
+    output_mfs: np.ndarray,
+    antecedents: np.ndarray,
+    consequents: np.ndarray,
+    input_universe: np.ndarray,
+    output_universe: np.ndarray,
+) -> np.ndarray:
+    """Inferensi Mamdani (AND = min, agregasi = max, defuzzifikasi centroid) untuk banyak baris sekaligus.
+
+    `values` berbentuk (baris, 3) dengan urutan INPUTS; `input_mfs` berisi array (term, universe) per
+    variabel input, `output_mfs` array (term, universe). `antecedents` (rule, 3) dan `consequents` (rule,)
+    berisi indeks term. Baris tanpa rule yang aktif bernilai 0, sama seperti `compute_ranking`.
+    """
+    return variant_scores(values, [input_mfs], [output_mfs], antecedents, [consequents],
+                          input_universe, output_universe)[0]
+
+
+def variant_scores(
+    values: np.ndarray,
+    input_mfs: List[List[np.ndarray]],
+    output_mfs: List[np.ndarray],
+    antecedents: np.ndarray,
+    consequents: List[np.ndarray],
+    input_universe: np.ndarray,
+    output_universe: np.ndarray,
+) -> np.ndarray:
+    """Seperti `fuzzy_scores`, tetapi untuk beberapa konfigurasi (varian) sekaligus: hasil (varian, baris).
+
+    Derajat keanggotaan dihitung sekali untuk setiap membership function yang sama antar varian,
+    jadi varian yang hanya mengubah tabel rule tidak menghitung ulang interpolasi input.
+    """
+    values = np.asarray(values, dtype=float)
+    weights = np.column_stack(_centroid_weights(np.asarray(output_universe, dtype=float)))
+    interpolated: Dict[bytes, np.ndarray] = {}
+
+    def membership(var: int, mf: np.ndarray) -> np.ndarray:
+        key = bytes([var]) + np.asarray(mf, dtype=float).tobytes()
+        if key not in interpolated:
+            interpolated[key] = np.interp(values[:, var], input_universe, mf)
+        return interpolated[key]
+
+    scores = np.zeros((len(output_mfs), len(values)))
+    for variant in range(len(output_mfs)):
+        # Derajat keanggotaan tiap term: (variabel) -> (term, baris)
+        memberships = [
+            np.array([membership(var, mf) for mf in input_mfs[variant][var]])
+            for var in range(len(input_mfs[variant]))
+        ]
+        # Kekuatan tiap rule = min dari ketiga antecedent: (rule, baris)
+        firing = memberships[0][antecedents[:, 0]]
+        for var in range(1, len(memberships)):
+            firing = np.minimum(firing, memberships[var][antecedents[:, var]])
+        # Potongan tiap term output = max kekuatan rule yang menghasilkan term tersebut
+        variant_consequents = np.asarray(consequents[variant])
+        terms = np.asarray(output_mfs[variant], dtype=float)
+        cuts = np.zeros((len(terms), len(values)))
+        for term in range(len(terms)):
+            mask = variant_consequents == term
+            if mask.any():
+                cuts[term] = firing[mask].max(axis=0)
+        scores[variant] = _centroids(cuts, terms, output_universe, weights)
+    return scores
+
+
+def _centroids(cuts: np.ndarray, output_mfs: np.ndarray, universe: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Centroid agregasi max(min(cut, mf)) per baris, diproses per BATCH_ROWS baris"""
+    scores = np.zeros(cuts.shape[1])
+    for start in range(0, len(scores), BATCH_ROWS):
+        stop = start + BATCH_ROWS
+        aggregated = np.minimum(cuts[0, start:stop, None], output_mfs[0])
+        for term in range(1, len(output_mfs)):
+            np.maximum(aggregated, np.minimum(cuts[term, start:stop, None], output_mfs[term]), out=aggregated)
+        # einsum, bukan matmul: hasil per baris tidak bergantung pada ukuran batch (BLAS bisa berbeda di digit terakhir)
+        area = np.einsum('ij,j->i', aggregated, weights[:, 0])
+        moment = np.einsum('ij,j->i', aggregated, weights[:, 1])
+        area_fix, moment_fix = _cut_point_corrections(cuts[:, start:stop], output_mfs, universe)
+        area += area_fix
+        moment += moment_fix
+        scores[start:stop] = np.divide(moment, area, out=np.zeros_like(area), where=area > 0)
+    return scores
+
+
+def _segment(left, right, f_left, f_right) -> Tuple[np.ndarray, np.ndarray]:
+    """Luas dan momen fungsi linear pada segmen [left, right]"""
+    width = right - left
+    return (width * (f_left + f_right) / 2,
+            width * (left * (2 * f_left + f_right) + right * (f_left + 2 * f_right)) / 6)
+
+
+def _crossings(mf: np.ndarray, universe: np.ndarray, cut: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Segmen grid dan titik tempat mf unimodal (trimf) memotong level `cut`, seperti
+    `_interp_universe_fast` skfuzzy: maksimal satu di sisi naik dan satu di sisi turun, (baris, 2).
+    Segmen -1 berarti tidak ada titik potong."""
+    peak = int(np.argmax(mf))
+    if np.any(np.diff(mf[:peak + 1]) < 0) or np.any(np.diff(mf[peak:]) > 0):
+        raise ValueError("Output membership functions must be unimodal")
+    # Sisi naik: indeks pertama dengan mf >= cut; sisi turun: indeks terakhir dengan mf >= cut
+    first_above = np.searchsorted(mf[:peak + 1], cut, 'left')
+    last_above = len(mf) - np.searchsorted(mf[peak:][::-1], cut, 'left') - 1
+    segments = np.column_stack([
+        np.where((first_above >= 1) & (first_above <= peak), first_above - 1, -1),
+        np.where((last_above >= peak) & (last_above < len(mf) - 1), last_above, -1),
+    ])
+    safe = np.maximum(segments, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        points = universe[safe] + (cut[:, None] - mf[safe]) * (universe[safe + 1] - universe[safe]) / (mf[safe + 1] - mf[safe])
+    return segments, np.where(segments >= 0, points, np.inf)
+
+
+def _cut_point_corrections(cuts: np.ndarray, output_mfs: np.ndarray, universe: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Selisih luas dan momen karena titik potong cut pada universe.
+
+    skfuzzy menambahkan titik tempat mf tiap term memotong nilai cut-nya ke universe sebelum menghitung
+    centroid; di titik itu agregasi membentuk sudut yang hilang jika hanya memakai grid. Titik-titik itu
+    disisipkan berurutan ke segmen grid-nya sehingga hasilnya sama dengan skfuzzy.
+    """
+    found = [_crossings(mf, universe, cuts[term]) for term, mf in enumerate(output_mfs)]
+    segments = np.concatenate([segment for segment, _ in found], axis=1)
+    points = np.concatenate([point for _, point in found], axis=1)
+    order = np.argsort(points, axis=1, kind='stable')
+    segments, points = np.take_along_axis(segments, order, 1), np.take_along_axis(points, order, 1)
+
+    def aggregate(x: np.ndarray) -> np.ndarray:
+        return np.max([np.minimum(cuts[term], np.interp(x, universe, mf)) for term, mf in enumerate(output_mfs)], axis=0)
+
+    area_fix, moment_fix = np.zeros(cuts.shape[1]), np.zeros(cuts.shape[1])
+    previous_segment, previous_point, previous_value = None, None, None
+    # Disisipkan dari kiri ke kanan: tetangga kiri adalah titik sebelumnya jika berada di segmen yang sama
+    for column in range(segments.shape[1]):
+        segment = segments[:, column]
+        valid = segment >= 0
+        safe = np.maximum(segment, 0)
+        left, right = universe[safe], universe[safe + 1]
+        # Baris tanpa titik potong memakai titik grid kiri (koreksinya nol)
+        point = np.where(valid, points[:, column], left)
+        value = aggregate(point)
+        f_left, f_right = aggregate(left), aggregate(right)
+        if previous_segment is not None:
+            same = valid & (previous_segment == segment)
+            left = np.where(same, previous_point, left)
+            f_left = np.where(same, previous_value, f_left)
+        split = [a + b for a, b in zip(_segment(left, point, f_left, value), _segment(point, right, value, f_right))]
+        whole = _segment(left, right, f_left, f_right)
+        area_fix += np.where(valid, split[0] - whole[0], 0)
+        moment_fix += np.where(valid, split[1] - whole[1], 0)
+        previous_segment, previous_point, previous_value = segment, point, value
+    return area_fix, moment_fix
+
 
 class FuzzyRanking:
     def __init__(self):
@@ -25,28 +210,15 @@ class FuzzyRanking:
         # Buat sistem kontrol
         self.ranking_ctrl = ctrl.ControlSystem(self.rules)
         self.ranking_simulation = ctrl.ControlSystemSimulation(self.ranking_ctrl)
+
+        # Bentuk array dari membership function dan rule untuk evaluasi vektor (compute_rankings)
+        self._compile_rules()
     
     def _setup_membership_functions(self):
         """Mendefinisikan fungsi keanggotaan untuk masing-masing variabel"""
-        # Cost membership functions
-        self.cost_norm['low'] = fuzz.trimf(self.cost_norm.universe, [0, 0, 0.0543])
-        self.cost_norm['medium'] = fuzz.trimf(self.cost_norm.universe, [0.0272, 0.0543, 0.2716])
-        self.cost_norm['high'] = fuzz.trimf(self.cost_norm.universe, [0.0543, 1, 1])
-        
-        # Clicks membership functions
-        self.clicks_norm['low'] = fuzz.trimf(self.clicks_norm.universe, [0, 0, 0.0547])
-        self.clicks_norm['medium'] = fuzz.trimf(self.clicks_norm.universe, [0.0273, 0.1823, 0.546])
-        self.clicks_norm['high'] = fuzz.trimf(self.clicks_norm.universe, [0.1823, 1, 1])
-        
-        # Impressions membership functions
-        self.impressions_norm['low'] = fuzz.trimf(self.impressions_norm.universe, [0, 0, 0.0204])
-        self.impressions_norm['medium'] = fuzz.trimf(self.impressions_norm.universe, [0.0204, 0.051, 0.102])
-        self.impressions_norm['high'] = fuzz.trimf(self.impressions_norm.universe, [0.051, 1, 1])
-        
-        # Ranking output membership functions
-        self.ranking['low'] = fuzz.trimf(self.ranking.universe, [0, 0, 0.5])
-        self.ranking['medium'] = fuzz.trimf(self.ranking.universe, [0.25, 0.5, 0.75])
-        self.ranking['high'] = fuzz.trimf(self.ranking.universe, [0.5, 1, 1])
+        for variable in [self.cost_norm, self.clicks_norm, self.impressions_norm, self.ranking]:
+            for term, params in MEMBERSHIP_PARAMS[variable.label].items():
+                variable[term] = fuzz.trimf(variable.universe, params)
     
     def _setup_rules(self):
         """Membuat aturan fuzzy"""
@@ -100,8 +272,82 @@ class FuzzyRanking:
                  rule10, rule11, rule12, rule13, rule14, rule15, rule16, rule17, rule18, 
                  rule19, rule20, rule21, rule22, rule23, rule24, rule25, rule26, rule27]
 
+    def _compile_rules(self):
+        """Menyusun membership function dan tabel rule sebagai array NumPy"""
+        inputs = [self.cost_norm, self.clicks_norm, self.impressions_norm]
+        self.input_universe = self.cost_norm.universe
+        self.input_mfs = [np.array([variable[term].mf for term in TERMS]) for variable in inputs]
+        self.output_mfs = np.array([self.ranking[term].mf for term in TERMS])
+        antecedents, consequents = [], []
+        for rule in self.rules:
+            terms = {term.parent.label: term.label for term in rule.antecedent_terms}
+            antecedents.append([TERMS.index(terms[name]) for name in INPUTS])
+            consequents.append(TERMS.index(rule.consequent[0].term.label))
+        self.antecedents = np.array(antecedents)
+        self.consequents = np.array(consequents)
+
+    def compute_rankings(self, cost_norm, clicks_norm, impressions_norm) -> np.ndarray:
+        """Versi vektor dari compute_ranking untuk banyak baris sekaligus.
+
+        Titik potong cut disisipkan seperti skfuzzy, sehingga selisihnya hanya pembulatan float64
+        (terukur < 1e-14, dijamin < 1e-12 pada universe produksi).
+        """
+        values = np.column_stack([
+            np.ravel(cost_norm).astype(float),
+            np.ravel(clicks_norm).astype(float),
+            np.ravel(impressions_norm).astype(float),
+        ])
+        return fuzzy_scores(values, self.input_mfs, self.output_mfs, self.antecedents, self.consequents,
+                            self.input_universe, self.ranking.universe)
+
+    def rule_table(self) -> List[Dict[str, str]]:
+        """Tabel rule produksi sesuai urutan rule1..rule27 (urutan yang dipakai `rules` pada varian)"""
+        return [
+            {**{name: TERMS[term] for name, term in zip(INPUTS, antecedent)}, 'ranking': TERMS[consequent]}
+            for antecedent, consequent in zip(self.antecedents.tolist(), self.consequents.tolist())
+        ]
+
+    def variant(self, membership: Optional[Dict[str, Dict[str, List[float]]]] = None, rules: Optional[List[str]] = None):
+        """Membership function dan consequent satu varian: konfigurasi produksi yang ditimpa `membership`
+        (variabel -> term -> [a, b, c]) dan/atau `rules` (term output untuk tiap rule, urutan `rule_table`)"""
+        params = {name: dict(terms) for name, terms in MEMBERSHIP_PARAMS.items()}
+        for name, terms in (membership or {}).items():
+            if name not in params:
+                raise ValueError(f"Unknown variable '{name}', expected one of {list(params)}")
+            for term, values in terms.items():
+                if term not in TERMS:
+                    raise ValueError(f"Unknown term '{term}' for {name}, expected one of {list(TERMS)}")
+                if len(values) != 3 or not values[0] <= values[1] <= values[2]:
+                    raise ValueError(f"{name}['{term}'] must be [a, b, c] with a <= b <= c")
+                params[name][term] = values
+        if rules is None:
+            consequents = self.consequents
+        elif len(rules) != len(self.consequents) or any(term not in TERMS for term in rules):
+            raise ValueError(f"rules must list {len(self.consequents)} output terms from {list(TERMS)}")
+        else:
+            consequents = np.array([TERMS.index(term) for term in rules])
+
+        input_mfs = [np.array([fuzz.trimf(self.input_universe, params[name][term]) for term in TERMS]) for name in INPUTS]
+        output_mfs = np.array([fuzz.trimf(self.ranking.universe, params['ranking'][term]) for term in TERMS])
+        return input_mfs, output_mfs, consequents
+
+    def compute_variant_rankings(self, cost_norm, clicks_norm, impressions_norm, variants: List[Tuple]) -> np.ndarray:
+        """Skor semua baris untuk setiap varian (hasil `variant`) dalam satu evaluasi: (varian, baris)"""
+        values = np.column_stack([
+            np.ravel(cost_norm).astype(float),
+            np.ravel(clicks_norm).astype(float),
+            np.ravel(impressions_norm).astype(float),
+        ])
+        input_mfs, output_mfs, consequents = zip(*variants)
+        return variant_scores(values, input_mfs, output_mfs, self.antecedents, consequents,
+                              self.input_universe, self.ranking.universe)
+
     def compute_ranking(self, row: Dict[str, float]) -> float:
-        """Menghitung ranking berdasarkan input data yang sudah dinormalisasi"""
+        """Menghitung ranking satu baris lewat simulasi skfuzzy.
+
+        Implementasi referensi: aplikasi memakai `compute_rankings`; fungsi ini dipakai untuk memeriksa
+        bahwa versi vektor tetap sama dengan skfuzzy.
+        """
         self.ranking_simulation.reset()  # Reset simulasi untuk setiap perhitungan
 
         try:
@@ -154,19 +400,24 @@ class FuzzyRanking:
         if not data:
             return []
         
+        started = time.perf_counter()
+
         # Normalisasi data
         normalized_data, _ = self.normalize_data(data)
         
-        # Hitung ranking untuk setiap baris
-        for row in normalized_data:
-            norm_data = {
-                'cost_norm': row.get('cost_norm', 0),
-                'clicks_norm': row.get('clicks_norm', 0),
-                'impressions_norm': row.get('impressions_norm', 0)
-            }
-            row['ranking'] = self.compute_ranking(norm_data)
+        # Hitung ranking semua baris dalam satu evaluasi vektor
+        rankings = self.compute_rankings(
+            [row.get('cost_norm', 0) for row in normalized_data],
+            [row.get('clicks_norm', 0) for row in normalized_data],
+            [row.get('impressions_norm', 0) for row in normalized_data],
+        )
+        for row, ranking in zip(normalized_data, rankings):
+            row['ranking'] = float(ranking)
         
         # Urutkan data berdasarkan ranking (tertinggi di atas)
         sorted_data = sorted(normalized_data, key=lambda x: x.get('ranking', 0), reverse=True)
+
+        # Catat waktu ranking per baris untuk endpoint /metrics
+        record_ranking(len(sorted_data), time.perf_counter() - started)
         
         return sorted_data
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""Startup report: per-module import time and resident memory of `app.main`, measured in fresh interpreters.
+
+    python -m app.utils.import_report                    # cold import of app.main
+    python -m app.utils.import_report --warm             # also load the lazy subsystems
+    python -m app.utils.import_report --budget-ms 1000   # exit 1 if the cold import exceeds the budget
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
+
+# Cold import budget for app.main, enforced by tests/test_import_budget.py and checked with --budget-ms
+DEFAULT_BUDGET_MS = 1000
+
+# Dependencies that must only load lazily, never on `import app.main`
+HEAVY_MODULES = ('cv2', 'numpy', 'pandas', 'sklearn', 'skfuzzy', 'scipy')
+
+_PROBE = """
+import json, sys, time
+from app.utils.lazy import current_rss_bytes
+rss_start = current_rss_bytes()
+started = time.perf_counter()
+import app.main
+import_ms = (time.perf_counter() - started) * 1000
+result = {'import_ms': import_ms, 'rss_start_mb': rss_start / 2 ** 20, 'rss_after_import_mb': current_rss_bytes() / 2 ** 20,
+          'heavy_modules': [module for module in HEAVY_MODULES if module in sys.modules]}
+if WARM:
+    from app.utils.lazy import warm_up
+    result['warm'] = warm_up()
+print(json.dumps(result))
+"""
+
+
+def _project_root() -> str:
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def probe(warm: bool = False) -> Tuple[Dict[str, Any], List[Tuple[str, int, int]]]:
+    """Import app.main in a fresh interpreter; return its measurements and `-X importtime` rows."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"WARM = {warm!r}\nHEAVY_MODULES = {HEAVY_MODULES!r}\n{_PROBE}"],
+        cwd=_project_root(), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return json.loads(completed.stdout.strip().splitlines()[-1]), rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report import time and memory of app.main.")
+    parser.add_argument('--warm', action='store_true', help='also load the lazy heavy subsystems')
+    parser.add_argument('--top', type=int, default=20, help='number of modules to list')
+    parser.add_argument('--runs', type=int, default=3, help='cold imports to take the median of')
+    parser.add_argument('--budget-ms', type=float, default=None, help=f'fail if the median cold import exceeds this (the tests use {DEFAULT_BUDGET_MS})')
+    args = parser.parse_args()
+
+    results = [probe() for _ in range(max(args.runs, 1))]
+    import_ms = statistics.median(result['import_ms'] for result, _ in results)
+    result, rows = results[-1]
+
+    print(f"app.main cold import: {import_ms:.0f} ms (median of {len(results)} runs)")
+    print(f"RSS: {result['rss_start_mb']:.1f} MB at interpreter start, {result['rss_after_import_mb']:.1f} MB after import")
+    print(f"\nTop {args.top} modules by cumulative import time:")
+    print(f"{'module':<50}{'self ms':>10}{'cumulative ms':>15}")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{name:<50}{self_us / 1000:>10.1f}{cumulative_us / 1000:>15.1f}")
+
+    if args.warm:
+        warm = probe(warm=True)[0]['warm']
+        print(f"\nAfter warm-up: RSS {warm['rss_mb']:.1f} MB")
+        for subsystem in warm['subsystems']:
+            print(f"  {subsystem['name']:<20} load {subsystem['load_ms']} ms, +{subsystem['rss_delta_mb']} MB")
+
+    if args.budget_ms is not None and import_ms > args.budget_ms:
+        print(f"\nFAIL: cold import {import_ms:.0f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import traceback
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import Settings
+from app.utils.auth_utils import redis_client
+
+settings = Settings()
+
+# How often workers look for jobs orphaned by a crashed or restarted process
+RECOVERY_INTERVAL = 30
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+class JobFailed(Exception):
+    """Raised by a handler for an expected failure (e.g. an upstream API error); no traceback is logged."""
+
+    def __init__(self, message: str, stage: Optional[str] = None):
+        super().__init__(message)
+        self.stage = stage
+
+
+class Job:
+    """A job being processed by a worker. Handlers report progress through `progress`."""
+
+    def __init__(self, queue: 'JobQueue', job_id: str, fields: Dict[str, str]):
+        self.queue = queue
+        self.id = job_id
+        self.fields = fields
+
+    def payload(self) -> bytes:
+        with open(self.queue.payload_path(self.id), 'rb') as payload_file:
+            return payload_file.read()
+
+    async def progress(self, stage: str, percent: int, **fields: Any) -> None:
+        """Persist the current stage (and any intermediate results) and notify listeners."""
+        self.fields.update({key: str(value) for key, value in fields.items()})
+        await self.queue.update(self.id, stage=stage, progress=percent, **fields)
+
+
+class JobQueue:
+    """Reliable Redis job queue with an in-process asyncio worker pool.
+
+    Job state lives in the `job:<id>` hash and uploads in a spool directory, so a restarted process can
+    pick up jobs that were queued or running. Running jobs carry a heartbeat; a job whose heartbeat is
+    older than JOB_LEASE_SECONDS is moved back to the pending list and its handler runs again, which can
+    skip stages whose results were saved through `Job.progress`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Job], Awaitable[Dict[str, Any]]],
+        on_update: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        workers: int = settings.JOB_WORKERS,
+    ):
+        self.name = name
+        self.handler = handler
+        self.on_update = on_update
+        self.workers = workers
+        self.pending_key = f'jobs:{name}:pending'
+        self.processing_key = f'jobs:{name}:processing'
+        self.spool_dir = settings.JOB_SPOOL_DIR or os.path.join(tempfile.gettempdir(), 'tiktokapi-jobs')
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    def payload_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, job_id)
+
+    def enqueue(self, fields: Dict[str, Any], payload: bytes, job_id: Optional[str] = None) -> str:
+        """Store the payload and job state, then push the job onto the pending list."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        job_id = job_id or new_job_id()
+        with open(self.payload_path(job_id), 'wb') as payload_file:
+            payload_file.write(payload)
+        now = _now()
+        state = {**{key: str(value) for key, value in fields.items()},
+                 'id': job_id, 'queue': self.name, 'status': 'queued', 'stage': 'queued', 'progress': 0,
+                 'created_at': now, 'updated_at': now, 'heartbeat': time.time()}
+        pipeline = redis_client.pipeline()
+        pipeline.hset(f'job:{job_id}', mapping=state)
+        pipeline.lpush(self.pending_key, job_id)
+        pipeline.execute()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        state = redis_client.hgetall(f'job:{job_id}')
+        if not state:
+            return None
+        state['progress'] = int(state.get('progress', 0))
+        state.pop('heartbeat', None)
+        if 'result' in state:
+            state['result'] = json.loads(state['result'])
+        return state
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        values = {key: json.dumps(value) if isinstance(value, (dict, list)) else str(value) for key, value in fields.items()}
+        values['updated_at'] = _now()
+        values['heartbeat'] = str(time.time())
+        await asyncio.to_thread(redis_client.hset, f'job:{job_id}', mapping=values)
+        if self.on_update:
+            state = await asyncio.to_thread(self.get, job_id)
+            if state:
+                # The state is already saved; a failed notification must not fail the job
+                try:
+                    await self.on_update(state)
+                except Exception as e:
+                    print(f"Job {job_id}: update notification failed: {e}")
+
+    def recover_stale(self) -> int:
+        """Move running jobs whose heartbeat expired back to the pending list."""
+        recovered = 0
+        deadline = time.time() - settings.JOB_LEASE_SECONDS
+        for job_id in redis_client.lrange(self.processing_key, 0, -1):
+            heartbeat = redis_client.hget(f'job:{job_id}', 'heartbeat')
+            if heartbeat is not None and float(heartbeat) > deadline:
+                continue
+            # LREM first so only one process requeues a given job
+            if redis_client.lrem(self.processing_key, 1, job_id):
+                redis_client.hset(f'job:{job_id}', mapping={'status': 'queued', 'updated_at': _now()})
+                redis_client.rpush(self.pending_key, job_id)
+                recovered += 1
+        return recovered
+
+    async def start(self) -> None:
+        self._stopping.clear()
+        await asyncio.to_thread(self.recover_stale)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._recover_periodically()))
+
+    async def stop(self) -> None:
+        """Stop taking new jobs. Interrupted jobs stay in the processing list and are recovered later."""
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _recover_periodically(self) -> None:
+        while not self._stopping.is_set():
+            await asyncio.sleep(RECOVERY_INTERVAL)
+            try:
+                await asyncio.to_thread(self.recover_stale)
+            except Exception as e:
+                print(f"Job queue {self.name}: recovery failed: {e}")
+
+    async def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job_id = await asyncio.to_thread(redis_client.brpoplpush, self.pending_key, self.processing_key, 1)
+            except Exception as e:
+                print(f"Job queue {self.name}: Redis error {e}")
+                await asyncio.sleep(1)
+                continue
+            if not job_id:
+                continue
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                # The job stays in the processing list and is requeued once its lease expires
+                print(f"Job queue {self.name}: job {job_id} interrupted: {e}\n{traceback.format_exc()}")
+                await asyncio.sleep(1)
+
+    async def _run(self, job_id: str) -> None:
+        fields = await asyncio.to_thread(redis_client.hgetall, f'job:{job_id}')
+        if not fields:
+            await asyncio.to_thread(redis_client.lrem, self.processing_key, 1, job_id)
+            return
+        job = Job(self, job_id, fields)
+        await self.update(job_id, status='running')
+        # Keep the lease alive while a single stage (e.g. a slow upload) runs longer than the lease
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            result = await self.handler(job)
+            await self.update(job_id, status='completed', stage='completed', progress=100, result=result)
+        except asyncio.CancelledError:
+            raise
+        except JobFailed as e:
+            await self.update(job_id, status='failed', error=str(e))
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}\n{traceback.format_exc()}")
+            await self.update(job_id, status='failed', error=str(e))
+        finally:
+            heartbeat.cancel()
+        await asyncio.to_thread(self._finish, job_id)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        interval = max(settings.JOB_LEASE_SECONDS / 3, 0.1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(redis_client.hset, f'job:{job_id}', 'heartbeat', str(time.time()))
+            except Exception as e:
+                print(f"Job {job_id}: heartbeat failed: {e}")
+
+    def _finish(self, job_id: str) -> None:
+        pipeline = redis_client.pipeline()
+        pipeline.lrem(self.processing_key, 1, job_id)
+        pipeline.expire(f'job:{job_id}', settings.JOB_TTL_SECONDS)
+        pipeline.execute()
+        try:
+            os.unlink(self.payload_path(job_id))
+        except FileNotFoundError:
+            pass
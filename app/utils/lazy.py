@@ -0,0 +1,92 @@
+import os
+import resource
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+def current_rss_bytes() -> int:
+    """Resident memory of this process (current on Linux, peak elsewhere)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class LazySubsystem:
+    """A heavy dependency (e.g. OpenCV or the fuzzy engine) loaded on first use or on warm-up.
+
+    Load time and the resident memory it added are recorded for the startup report.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.name = name
+        self._loader = loader
+        self._value: Any = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        self.rss_delta_bytes: Optional[int] = None
+        self.loaded_at: Optional[float] = None
+        SUBSYSTEMS[name] = self
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> Any:
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                rss_before = current_rss_bytes()
+                started = time.perf_counter()
+                self._value = self._loader()
+                self.load_seconds = time.perf_counter() - started
+                self.rss_delta_bytes = current_rss_bytes() - rss_before
+                self.loaded_at = time.time()
+                self._loaded = True
+        return self._value
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'loaded': self._loaded,
+            'load_ms': round(self.load_seconds * 1000, 1) if self.load_seconds is not None else None,
+            'rss_delta_mb': round(self.rss_delta_bytes / 2 ** 20, 1) if self.rss_delta_bytes is not None else None,
+        }
+
+
+SUBSYSTEMS: Dict[str, LazySubsystem] = {}
+
+_process_started = time.time()
+# Filled in when app.main finishes importing
+_startup: Dict[str, Any] = {}
+
+
+def record_app_import(seconds: float) -> None:
+    _startup['app_import_ms'] = round(seconds * 1000, 1)
+    _startup['rss_after_import_mb'] = round(current_rss_bytes() / 2 ** 20, 1)
+
+
+def warm_up(names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Load the given subsystems (all by default) and return the startup report."""
+    for name in names or list(SUBSYSTEMS):
+        SUBSYSTEMS[name].get()
+    return startup_report()
+
+
+def startup_report() -> Dict[str, Any]:
+    """Import time and memory of the app plus the load state of every lazy subsystem."""
+    heavy = ('cv2', 'numpy', 'pandas', 'sklearn', 'skfuzzy', 'scipy', 'matplotlib')
+    return {
+        **_startup,
+        'rss_mb': round(current_rss_bytes() / 2 ** 20, 1),
+        'uptime_s': round(time.time() - _process_started, 1),
+        'subsystems': [subsystem.report() for subsystem in SUBSYSTEMS.values()],
+        'heavy_modules_loaded': [module for module in heavy if module in sys.modules],
+    }
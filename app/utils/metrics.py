@@ -0,0 +1,297 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default latency buckets (seconds), tuned for HTTP handlers and upstream API calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Buckets for per-row ranking time, which is in the microsecond to millisecond range
+ROW_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05)
+
+_API_PREFIX = re.compile(r'^/open_api/v\d+(\.\d+)?')
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base class for a labelled metric family kept in process memory."""
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Sequence[str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {labels}')
+        return tuple(str(label) for label in labels)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {} if labelnames else {(): 0.0}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}' for key, value in items]
+
+
+class RouteInFlightGauge(Gauge):
+    """Gauge of in-flight requests per route, labelled when scraped.
+
+    A request's route is only known once the router has dispatched it, so the live scopes are tracked
+    and labelled with `route_label_for` at render time; requests not dispatched yet count as 'unmatched'.
+    """
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation, ('route',))
+        self._scopes: Dict[int, dict] = {}
+
+    def track(self, scope) -> None:
+        with self._lock:
+            self._scopes[id(scope)] = scope
+
+    def untrack(self, scope) -> None:
+        with self._lock:
+            self._scopes.pop(id(scope), None)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            scopes = list(self._scopes.values())
+        counts: Dict[Tuple[str, ...], float] = {}
+        for scope in scopes:
+            key = (route_label_for(scope),)
+            counts[key] = counts.get(key, 0.0) + 1
+        with self._lock:
+            # Routes seen before stay in the output with 0
+            self._values = {**dict.fromkeys(self._values, 0.0), **counts}
+        return super()._samples()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = ([0] * (len(self.buckets) + 1), [0.0])
+                self._values[key] = state
+            state[0][index] += 1
+            state[1][0] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+# HTTP server metrics
+HTTP_REQUEST_SECONDS = Histogram(
+    'tiktokapi_http_request_duration_seconds', 'Latency of HTTP requests handled by the app.',
+    ('method', 'route', 'status'))
+HTTP_REQUESTS_IN_FLIGHT = RouteInFlightGauge(
+    'tiktokapi_http_requests_in_flight', 'HTTP requests currently being handled.')
+
+# Upstream TikTok API metrics
+UPSTREAM_REQUESTS = Counter(
+    'tiktokapi_upstream_requests_total', 'Calls made to the TikTok API by endpoint and result code.',
+    ('endpoint', 'method', 'code'))
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    'tiktokapi_upstream_request_duration_seconds', 'Latency of calls made to the TikTok API.',
+    ('endpoint', 'method'))
+
+# Ranking engine metrics
+RANKING_ROWS = Counter('tiktokapi_ranking_rows_total', 'Rows scored by the fuzzy ranking engine.')
+RANKING_ROW_SECONDS = Histogram(
+    'tiktokapi_ranking_row_seconds', 'Average fuzzy ranking time per row, observed once per ranking call.',
+    buckets=ROW_BUCKETS)
+
+# Socket.IO metrics
+SOCKETIO_CONNECTIONS = Gauge('tiktokapi_socketio_connections', 'Active Socket.IO connections.')
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+def endpoint_label(url: str) -> str:
+    """Reduce a TikTok API URL to its endpoint path, e.g. '/campaign/get/'."""
+    path = url.split('://', 1)[-1]
+    path = path[path.find('/'):] if '/' in path else '/'
+    path = path.split('?', 1)[0]
+    return _API_PREFIX.sub('', path) or '/'
+
+
+class _UpstreamCall:
+    __slots__ = ('code',)
+
+    def __init__(self):
+        self.code = 'exception'
+
+    def record(self, response) -> None:
+        """Derive the result code from an HTTP response (HTTP status or TikTok API `code`)."""
+        if response.status_code != 200:
+            self.code = f'http_{response.status_code}'
+            return
+        try:
+            self.code = str(response.json().get('code'))
+        except Exception:
+            self.code = 'invalid_json'
+
+
+@contextmanager
+def upstream_call(url: str, method: str) -> Iterator[_UpstreamCall]:
+    """Time a call to the TikTok API and count it by endpoint and result code.
+
+    The code defaults to 'exception' unless the caller sets `call.code` or calls `call.record(response)`.
+    """
+    call = _UpstreamCall()
+    endpoint = endpoint_label(url)
+    started = time.perf_counter()
+    try:
+        yield call
+    finally:
+        UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, method)
+        UPSTREAM_REQUESTS.inc(endpoint, method, call.code)
+
+
+def record_ranking(rows: int, seconds: float) -> None:
+    """Record the time the ranking engine took for a batch of rows."""
+    if rows <= 0:
+        return
+    RANKING_ROWS.inc(amount=rows)
+    RANKING_ROW_SECONDS.observe(seconds / rows)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and in-flight requests.
+
+    Routes are labelled by their path template (e.g. '/report/{type}') so label cardinality stays bounded.
+    The label is read from the scope after the app has handled the request, so routes are matched once.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = {'code': 500}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.track(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.untrack(scope)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, scope['method'], route_label_for(scope), str(status['code']))
+
+
+def route_label_for(scope) -> str:
+    """Label a dispatched request with its route template, or 'unmatched'.
+
+    The router records the matched route in the scope: FastAPI routes leave themselves in
+    `scope['route']`, mounts and plain Starlette routes only their app or endpoint in `scope['endpoint']`.
+    """
+    route = scope.get('route')
+    if route is not None:
+        return route.path
+    endpoint = scope.get('endpoint')
+    if endpoint is not None:
+        for route in getattr(scope.get('app'), 'routes', ()):
+            if getattr(route, 'endpoint', None) is endpoint or getattr(route, 'app', None) is endpoint:
+                return route.path
+    return 'unmatched'
@@ -0,0 +1,243 @@
+import asyncio
+import hmac
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, TypeVar
+from urllib.parse import parse_qs
+
+from app.config import Settings
+from app.utils.metrics import route_label_for
+
+settings = Settings()
+
+# Stack frames kept per sample and stacks returned per profile
+MAX_STACK_DEPTH = 40
+TOP_STACKS = 50
+
+
+class RequestProfile:
+    """Span breakdown and stack samples captured for a single request."""
+
+    def __init__(self, method: str, route: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.route = route
+        self.path = path
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.started = time.perf_counter()
+        self.duration_ms = 0.0
+        self.status: Optional[int] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.stacks: Counter = Counter()
+        self.sample_count = 0
+        # Worker threads currently running work for this request (ident -> nested calls)
+        self.threads: Counter = Counter()
+        self.threads_lock = threading.Lock()
+
+    def add_thread(self, ident: int) -> None:
+        with self.threads_lock:
+            self.threads[ident] += 1
+
+    def remove_thread(self, ident: int) -> None:
+        with self.threads_lock:
+            self.threads[ident] -= 1
+            if self.threads[ident] <= 0:
+                del self.threads[ident]
+
+    def worker_threads(self) -> List[int]:
+        with self.threads_lock:
+            return list(self.threads)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'method': self.method,
+            'route': self.route,
+            'path': self.path,
+            'status': self.status,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration_ms, 3),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Time not covered by any top-level span (routing, validation, response rendering)
+        covered = sum(span['duration_ms'] for span in self.spans if span['parent'] is None)
+        functions: Counter = Counter()
+        for stack, count in self.stacks.items():
+            functions[stack.rsplit(';', 1)[-1]] += count
+        return {
+            **self.summary(),
+            'spans': self.spans,
+            'unattributed_ms': round(max(self.duration_ms - covered, 0.0), 3),
+            'samples': {
+                'interval_ms': settings.PROFILE_INTERVAL_MS,
+                'count': self.sample_count,
+                'top_functions': [{'frame': frame, 'samples': count} for frame, count in functions.most_common(TOP_STACKS)],
+                'stacks': [{'stack': stack, 'samples': count} for stack, count in self.stacks.most_common(TOP_STACKS)],
+            },
+        }
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar('current_profile', default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar('current_span', default=None)
+
+_profiles: Deque[RequestProfile] = deque(maxlen=settings.PROFILE_BUFFER_SIZE)
+_profiles_lock = threading.Lock()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a named stage of the current request. A no-op unless the request is being profiled."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ended = time.perf_counter()
+        _current_span.reset(token)
+        profile.spans.append({
+            'name': name,
+            'parent': parent,
+            'start_ms': round((started - profile.started) * 1000, 3),
+            'duration_ms': round((ended - started) * 1000, 3),
+        })
+
+
+T = TypeVar('T')
+
+
+async def to_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """`asyncio.to_thread` whose worker thread is also sampled while the current request is profiled."""
+    profile = _current_profile.get()
+    if profile is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    def run() -> T:
+        ident = threading.get_ident()
+        profile.add_thread(ident)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.remove_thread(ident)
+
+    return await asyncio.to_thread(run)
+
+
+class _StackSampler(threading.Thread):
+    """Periodically sample the stacks of the threads that handle the request.
+
+    That is the event loop thread, plus worker threads while they run `to_thread` calls of the request.
+    Samples of the event loop cover everything running on it, so concurrent requests show up too.
+    """
+
+    def __init__(self, profile: RequestProfile, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.profile = profile
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in [self.thread_id, *self.profile.worker_threads()]:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                parts = []
+                while frame is not None and len(parts) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    parts.append(f'{code.co_name} ({code.co_filename}:{frame.f_lineno})')
+                    frame = frame.f_back
+                self.profile.stacks[';'.join(reversed(parts))] += 1
+                self.profile.sample_count += 1
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join()
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check a token against ADMIN_TOKEN. Always False while ADMIN_TOKEN is unset."""
+    if not settings.ADMIN_TOKEN or token is None:
+        return False
+    # compare_digest only accepts ASCII str, so non-ASCII tokens are compared as bytes
+    return hmac.compare_digest(token.encode('utf-8'), settings.ADMIN_TOKEN.encode('utf-8'))
+
+
+def _wants_profile(scope) -> bool:
+    """A request opts in with an `X-Profile: <admin token>` header or a `profile=<admin token>` query flag."""
+    if not settings.ADMIN_TOKEN:
+        return False
+    token = None
+    for name, value in scope.get('headers', []):
+        if name == b'x-profile':
+            token = value.decode('latin-1')
+            break
+    if token is None and scope.get('query_string'):
+        token = parse_qs(scope['query_string'].decode('latin-1')).get('profile', [None])[0]
+    return is_admin_token(token) and random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def get_profiles() -> List[Dict[str, Any]]:
+    """Summaries of the stored profiles, newest first."""
+    with _profiles_lock:
+        return [profile.summary() for profile in reversed(_profiles)]
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    with _profiles_lock:
+        for profile in _profiles:
+            if profile.id == profile_id:
+                return profile.to_dict()
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware capturing spans and stack samples for opted-in requests.
+
+    Finished profiles go into a bounded ring buffer and the response carries an `X-Profile-Id` header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # The route is labelled once the app has dispatched the request
+        profile = RequestProfile(scope['method'], 'unmatched', scope['path'])
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                profile.status = message['status']
+                message['headers'] = list(message.get('headers', [])) + [(b'x-profile-id', profile.id.encode())]
+            await send(message)
+
+        sampler = _StackSampler(profile, threading.get_ident(), settings.PROFILE_INTERVAL_MS / 1000)
+        token = _current_profile.set(profile)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            _current_profile.reset(token)
+            profile.route = route_label_for(scope)
+            profile.duration_ms = (time.perf_counter() - profile.started) * 1000
+            with _profiles_lock:
+                _profiles.append(profile)
@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.config import Settings
+
+settings = Settings()
+
+# Metric columns, in the input order of FuzzyRanking.compute_rankings
+COLUMNS = ("cost", "clicks", "impressions")
+
+# Vectorized scorer: (cost_norm, clicks_norm, impressions_norm) arrays in, ranking scores out
+Scorer = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+
+class VersionConflict(Exception):
+    """The client patched a different version than the session's current one."""
+
+
+class RankingSession:
+    """Fuzzy ranking of one advertiser's or campaign's ads that is kept up to date with deltas.
+
+    The session keeps the raw and normalized metrics, each column's min/max and the ranked order.
+    A delta rescores only the changed and added rows; when a column's min or max moves every row's
+    normalized value changes, so all rows are renormalized and rescored. Normalization and scores
+    match `FuzzyRanking.rank_ads` on the same ads.
+    """
+
+    def __init__(self, key: str, scorer: Scorer):
+        self.key = key
+        self.scorer = scorer
+        self.version = 0
+        self.lock = threading.Lock()
+        self.touched = time.time()
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.raw = np.zeros((0, len(COLUMNS)))
+        self.norm = np.zeros((0, len(COLUMNS)))
+        self.scores = np.zeros(0)
+        self.low = np.zeros(len(COLUMNS))
+        self.high = np.zeros(len(COLUMNS))
+        self.order = np.zeros(0, dtype=int)
+        self.ranks = np.zeros(0, dtype=int)
+
+    def load(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace the session's ads and rank them from scratch."""
+        # A repeated name keeps its last metrics
+        rows = {item["name"]: [float(item[column]) for column in COLUMNS] for item in items}
+        self.names = list(rows)
+        self.index = {name: row for row, name in enumerate(self.names)}
+        self.raw = np.array(list(rows.values()), dtype=float).reshape(-1, len(COLUMNS))
+        self._full_pass()
+        self.version += 1
+        return self.ranked()
+
+    def apply(
+        self,
+        changed: Iterable[Dict[str, Any]] = (),
+        added: Iterable[Dict[str, Any]] = (),
+        removed: Iterable[str] = (),
+        base_version: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Apply a delta and return the rows whose rank or score changed.
+
+        Changed and added ads are both upserts, so a retried delta is harmless; unknown removals are
+        ignored. With `base_version` the delta is rejected unless the session is still at that version.
+        """
+        if base_version is not None and base_version != self.version:
+            raise VersionConflict(f"session is at version {self.version}, not {base_version}")
+        previous_ranks, previous_scores = self.ranks, self.scores
+
+        # Removed rows are dropped; the remaining rows keep their relative order
+        removed_rows = sorted({self.index[name] for name in removed if name in self.index})
+        removed_names = [self.names[row] for row in removed_rows]
+        kept = np.ones(len(self.names), dtype=bool)
+        kept[removed_rows] = False
+        if removed_rows:
+            self.names = [name for name, keep in zip(self.names, kept) if keep]
+            self.index = {name: row for row, name in enumerate(self.names)}
+            self.raw, self.norm, self.scores = self.raw[kept], self.norm[kept], self.scores[kept]
+
+        # Updates are written in place, new ads are appended at the end
+        affected, new_names, new_values = [], [], []
+        for item in [*changed, *added]:
+            values = [float(item[column]) for column in COLUMNS]
+            row = self.index.get(item["name"])
+            if row is not None:
+                self.raw[row] = values
+                affected.append(row)
+            elif item["name"] in new_names:
+                new_values[new_names.index(item["name"])] = values
+            else:
+                new_names.append(item["name"])
+                new_values.append(values)
+        if new_names:
+            first = len(self.names)
+            self.names.extend(new_names)
+            self.index.update({name: first + offset for offset, name in enumerate(new_names)})
+            self.raw = np.vstack([self.raw, new_values])
+            self.norm = np.vstack([self.norm, np.zeros((len(new_names), len(COLUMNS)))])
+            self.scores = np.concatenate([self.scores, np.zeros(len(new_names))])
+            affected.extend(range(first, len(self.names)))
+
+        low, high = self._bounds()
+        full_pass = not (np.array_equal(low, self.low) and np.array_equal(high, self.high))
+        if full_pass:
+            self._full_pass()
+        else:
+            rows = np.unique(np.array(affected, dtype=int))
+            if len(rows):
+                self.norm[rows] = self._normalize(self.raw[rows])
+                self.scores[rows] = self.scorer(*self.norm[rows].T)
+            self._sort()
+        self.version += 1
+
+        # Previous rank and score of every current row (0 / NaN for added rows)
+        before = np.zeros(len(self.names), dtype=int)
+        before_scores = np.full(len(self.names), np.nan)
+        before[:kept.sum()] = previous_ranks[kept]
+        before_scores[:kept.sum()] = previous_scores[kept]
+        moved = np.flatnonzero((before != self.ranks) | (before_scores != self.scores))
+        moved = moved[np.argsort(self.ranks[moved])]
+        return {
+            "session": self.key,
+            "version": self.version,
+            "size": len(self.names),
+            "full_pass": full_pass,
+            "rescored": len(self.names) if full_pass else len(set(affected)),
+            # Rescored or added rows carry the full item; rows that only shifted carry just their ranks
+            "changes": [
+                {**self._item(row), "previous_rank": int(before[row]) or None} if before_scores[row] != self.scores[row]
+                else {"name": self.names[row], "rank": int(self.ranks[row]), "previous_rank": int(before[row])}
+                for row in moved
+            ],
+            "removed": removed_names,
+        }
+
+    def ranked(self) -> List[Dict[str, Any]]:
+        """Every ad, best first, in the `rank_ads` item format plus `rank`."""
+        return [self._item(row) for row in self.order]
+
+    def _bounds(self):
+        if not len(self.raw):
+            return np.zeros(len(COLUMNS)), np.zeros(len(COLUMNS))
+        return self.raw.min(axis=0), self.raw.max(axis=0)
+
+    def _normalize(self, raw: np.ndarray) -> np.ndarray:
+        # Same arithmetic as MinMaxScaler so scores (and ties) match rank_ads to the last bit
+        spread = self.high - self.low
+        scale = np.divide(1.0, spread, out=np.ones_like(spread), where=spread > 0)
+        return raw * scale - self.low * scale
+
+    def _full_pass(self) -> None:
+        self.low, self.high = self._bounds()
+        self.norm = self._normalize(self.raw)
+        self.scores = self.scorer(*self.norm.T) if len(self.raw) else np.zeros(0)
+        self._sort()
+
+    def _sort(self) -> None:
+        # Stable like rank_ads: equal scores keep their insertion order
+        self.order = np.argsort(-self.scores, kind="stable")
+        self.ranks = np.empty(len(self.order), dtype=int)
+        self.ranks[self.order] = np.arange(1, len(self.order) + 1)
+
+    def _item(self, row: int) -> Dict[str, Any]:
+        cost, clicks, impressions = self.raw[row]
+        cost_norm, clicks_norm, impressions_norm = self.norm[row]
+        return {
+            "name": self.names[row],
+            "cost": float(cost),
+            "impressions": int(impressions),
+            "clicks": int(clicks),
+            "ranking": float(self.scores[row]),
+            "cost_norm": float(cost_norm),
+            "impressions_norm": float(impressions_norm),
+            "clicks_norm": float(clicks_norm),
+            "rank": int(self.ranks[row]),
+        }
+
+
+class RankingSessionStore:
+    """In-process sessions by key, dropped when idle for `ttl` seconds or least recently used."""
+
+    def __init__(self, max_sessions: int, ttl: float):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, RankingSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[RankingSession]:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(key)
+            if session is not None:
+                session.touched = time.time()
+                self._sessions.move_to_end(key)
+            return session
+
+    def create(self, key: str, scorer: Scorer) -> RankingSession:
+        """Start a new, empty session, replacing any existing one with the same key."""
+        session = RankingSession(key, scorer)
+        with self._lock:
+            self._sessions.pop(key, None)
+            self._sessions[key] = session
+            self._expire()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(key, None) is not None
+
+    def _expire(self) -> None:
+        deadline = time.time() - self.ttl
+        for key in [key for key, session in self._sessions.items() if session.touched < deadline]:
+            del self._sessions[key]
+
+
+sessions = RankingSessionStore(settings.RANKING_SESSION_MAX, settings.RANKING_SESSION_TTL_SECONDS)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import urllib.parse
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import Settings
+from app.utils.api_utils import make_api_request
+
+settings = Settings()
+
+REPORT_METRICS = ["impressions", "clicks", "conversion", "spend", "ctr", "conversion_rate", "cpc"]
+
+# Largest page the TikTok API accepts and how many further pages are fetched at once
+PAGE_SIZE = 1000
+PAGE_CONCURRENCY = 5
+
+# Longest date range the API accepts in one report when the dimensions include stat_time_day
+DAILY_RANGE_DAYS = 30
+
+LEVELS = {
+    'campaign': {'data_level': 'AUCTION_CAMPAIGN', 'dimension': 'campaign_id', 'detail_endpoint': '/campaign/get/',
+                 'detail_fields': ["campaign_id", "campaign_name"]},
+    'adgroup': {'data_level': 'AUCTION_ADGROUP', 'dimension': 'adgroup_id', 'detail_endpoint': '/adgroup/get/',
+                'detail_fields': ["adgroup_id", "adgroup_name", "campaign_id", "campaign_name"]},
+    'ad': {'data_level': 'AUCTION_AD', 'dimension': 'ad_id', 'detail_endpoint': '/ad/get/',
+           'detail_fields': ["ad_id", "ad_name", "adgroup_id", "adgroup_name", "campaign_id", "campaign_name"]},
+}
+
+
+async def _fetch_pages(url: str, params: Dict[str, Any], access_token: str) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """Fetch every page of a paginated list endpoint; later pages are requested concurrently."""
+    headers = {'Access-Token': access_token}
+
+    def page_url(page: int) -> str:
+        query = {**params, 'page': page, 'page_size': PAGE_SIZE}
+        return f"{url}?{urllib.parse.urlencode({key: str(value) for key, value in query.items()})}"
+
+    first, error = await make_api_request(page_url(1), headers=headers)
+    if error:
+        return None, error
+    items = list(first.get('data', {}).get('list', []))
+    total_page = first.get('data', {}).get('page_info', {}).get('total_page', 1) or 1
+
+    semaphore = asyncio.Semaphore(PAGE_CONCURRENCY)
+
+    async def fetch(page: int):
+        async with semaphore:
+            return await make_api_request(page_url(page), headers=headers)
+
+    for response, error in await asyncio.gather(*(fetch(page) for page in range(2, total_page + 1))):
+        if error:
+            return None, error
+        items.extend(response.get('data', {}).get('list', []))
+    return items, None
+
+
+async def fetch_report(
+    access_token: str,
+    advertiser_id: str,
+    level: str,
+    dimensions: Optional[List[str]] = None,
+    filtering: Optional[Dict[str, Any]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """Fetch all rows of a BASIC integrated report for a level ('campaign', 'adgroup' or 'ad').
+
+    Without a start and end date the lifetime report is requested.
+    """
+    config = LEVELS[level]
+    params: Dict[str, Any] = {
+        'advertiser_id': advertiser_id,
+        'report_type': 'BASIC',
+        'data_level': config['data_level'],
+        'dimensions': json.dumps(dimensions or [config['dimension']]),
+        'metrics': json.dumps(REPORT_METRICS),
+    }
+    if start_date and end_date:
+        params['start_date'] = start_date
+        params['end_date'] = end_date
+    else:
+        params['query_lifetime'] = 'true'
+    if filtering:
+        params['filtering'] = json.dumps(filtering)
+    return await _fetch_pages(f"{settings.API_URL}/report/integrated/get/", params, access_token)
+
+
+def split_date_range(start_date: str, end_date: str, days: int = DAILY_RANGE_DAYS) -> List[Tuple[str, str]]:
+    """Split an inclusive YYYY-MM-DD range into consecutive ranges of at most `days` days."""
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    ranges = []
+    while start <= end:
+        chunk_end = min(start + timedelta(days=days - 1), end)
+        ranges.append((start.isoformat(), chunk_end.isoformat()))
+        start = chunk_end + timedelta(days=1)
+    return ranges
+
+
+async def fetch_daily_report(
+    access_token: str,
+    advertiser_id: str,
+    level: str,
+    start_date: str,
+    end_date: str,
+    filtering: Optional[Dict[str, Any]] = None,
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """Fetch one row per entity and day (`stat_time_day`) for a date range of any length.
+
+    The range is split into DAILY_RANGE_DAYS chunks that are fetched concurrently.
+    """
+    dimensions = [LEVELS[level]['dimension'], 'stat_time_day']
+    results = await asyncio.gather(*(
+        fetch_report(access_token, advertiser_id, level, dimensions=dimensions, filtering=filtering,
+                     start_date=chunk_start, end_date=chunk_end)
+        for chunk_start, chunk_end in split_date_range(start_date, end_date)
+    ))
+    rows: List[Dict[str, Any]] = []
+    for chunk_rows, error in results:
+        if error:
+            return None, error
+        rows.extend(chunk_rows)
+    return rows, None
+
+
+async def fetch_details(
+    access_token: str,
+    advertiser_id: str,
+    level: str,
+    filtering: Optional[Dict[str, Any]] = None,
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """Fetch names and parent ids of every entity of a level."""
+    config = LEVELS[level]
+    params: Dict[str, Any] = {'advertiser_id': advertiser_id, 'fields': json.dumps(config['detail_fields'])}
+    if filtering:
+        params['filtering'] = json.dumps(filtering)
+    return await _fetch_pages(f"{settings.API_URL}{config['detail_endpoint']}", params, access_token)
+
+
+def report_to_items(rows: List[Dict[str, Any]], dimension: str) -> List[Dict[str, Any]]:
+    """Convert report rows into ranking input (`name`, `cost`, `impressions`, `clicks`)."""
+    items = []
+    for row in rows:
+        metrics = row.get('metrics', {})
+        dimensions = row.get('dimensions', {})
+        items.append({
+            "name": dimensions.get(dimension, "Unknown"),
+            "cost": float(metrics.get("spend", 0)),
+            "impressions": int(metrics.get("impressions", 0)),
+            "clicks": int(metrics.get("clicks", 0)),
+        })
+    return items
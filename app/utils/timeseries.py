@@ -0,0 +1,136 @@
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Metric columns of the matrix, in the input order of FuzzyRanking.compute_rankings
+METRICS = ("cost", "clicks", "impressions")
+REPORT_FIELDS = {"cost": "spend", "clicks": "clicks", "impressions": "impressions"}
+
+# Longest range one time-series request may cover
+MAX_DAYS = 366
+
+# Score change per day above which an entity counts as improving (or below its negative, decaying)
+TREND_THRESHOLD = 0.001
+
+# Vectorized scorer: (cost_norm, clicks_norm, impressions_norm) arrays in, ranking scores out
+Scorer = Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+
+def days_between(start_date: str, end_date: str) -> List[str]:
+    """Every day of an inclusive YYYY-MM-DD range."""
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+
+def build_daily_matrix(rows: List[Dict[str, Any]], dimension: str, days: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Turn `stat_time_day` report rows into an entity x day x metric matrix.
+
+    Entity-days without a row (no delivery, or the entity did not exist yet) are zero.
+    """
+    day_index = {day: position for position, day in enumerate(days)}
+    entity_index: Dict[str, int] = {}
+    cells = []
+    for row in rows:
+        dimensions = row.get("dimensions", {})
+        # stat_time_day comes back as "YYYY-MM-DD HH:MM:SS"
+        day = day_index.get(str(dimensions.get("stat_time_day", ""))[:10])
+        if day is None:
+            continue
+        entity = entity_index.setdefault(dimensions.get(dimension, "Unknown"), len(entity_index))
+        metrics = row.get("metrics", {})
+        cells.append((entity, day, *(float(metrics.get(REPORT_FIELDS[metric], 0) or 0) for metric in METRICS)))
+
+    values = np.zeros((len(entity_index), len(days), len(METRICS)))
+    if cells:
+        table = np.array(cells)
+        entities, day_positions = table[:, 0].astype(int), table[:, 1].astype(int)
+        # Duplicate entity-days (e.g. overlapping chunks) are summed
+        np.add.at(values, (entities, day_positions), table[:, 2:])
+    return list(entity_index), values
+
+
+def normalize_per_day(values: np.ndarray) -> np.ndarray:
+    """Min-max normalize every metric across entities, separately for each day (like MinMaxScaler)."""
+    low = values.min(axis=0, keepdims=True)
+    spread = values.max(axis=0, keepdims=True) - low
+    return np.divide(values - low, spread, out=np.zeros_like(values), where=spread > 0)
+
+
+def rolling_mean(scores: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` days; the first days average over the days available so far."""
+    cumulative = np.cumsum(scores, axis=1)
+    shifted = np.zeros_like(cumulative)
+    shifted[:, window:] = cumulative[:, :-window]
+    counts = np.minimum(np.arange(1, scores.shape[1] + 1), window)
+    return (cumulative - shifted) / counts
+
+
+def trend_slopes(scores: np.ndarray) -> np.ndarray:
+    """Least-squares slope of each entity's daily score, in score per day."""
+    days = np.arange(scores.shape[1], dtype=float)
+    centered = days - days.mean()
+    denominator = (centered ** 2).sum()
+    if denominator == 0:
+        return np.zeros(len(scores))
+    return (scores - scores.mean(axis=1, keepdims=True)) @ centered / denominator
+
+
+def daily_ranks(scores: np.ndarray) -> np.ndarray:
+    """Rank of every entity on every day, 1 being the best score of that day."""
+    order = np.argsort(-scores, axis=0, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, len(scores) + 1)[:, None], axis=0)
+    return ranks
+
+
+def rank_timeseries(
+    scorer: Scorer,
+    entity_ids: List[str],
+    days: List[str],
+    values: np.ndarray,
+    window: int = 7,
+    include_daily: bool = True,
+    labels: Optional[Dict[str, str]] = None,
+) -> List[Dict[str, Any]]:
+    """Score every entity-day in one batch and summarize each entity's trajectory.
+
+    Items are sorted by their latest rolling mean, best first.
+    """
+    if not entity_ids:
+        return []
+    window = max(1, min(window, len(days)))
+    normalized = normalize_per_day(values)
+    scores = scorer(normalized[..., 0], normalized[..., 1], normalized[..., 2]).reshape(len(entity_ids), len(days))
+    rolling = rolling_mean(scores, window)
+    slopes = trend_slopes(scores)
+    ranks = daily_ranks(scores)
+    totals = values.sum(axis=1)
+    # Rolling mean one full window before the latest day, for the recent change
+    previous = rolling[:, -1 - window] if len(days) > window else rolling[:, 0]
+
+    items = []
+    for position, entity_id in enumerate(entity_ids):
+        slope = float(slopes[position])
+        item = {
+            "name": entity_id,
+            "label": (labels or {}).get(entity_id),
+            **{metric: float(totals[position, column]) for column, metric in enumerate(METRICS)},
+            "mean_score": float(scores[position].mean()),
+            "latest_score": float(scores[position, -1]),
+            "latest_rank": int(ranks[position, -1]),
+            "rolling_mean": float(rolling[position, -1]),
+            "rolling_change": float(rolling[position, -1] - previous[position]),
+            "trend_slope": slope,
+            "trend": "improving" if slope > TREND_THRESHOLD else "decaying" if slope < -TREND_THRESHOLD else "stable",
+            "active_days": int((values[position].sum(axis=1) > 0).sum()),
+        }
+        if include_daily:
+            item["daily"] = {
+                "scores": scores[position].round(6).tolist(),
+                "rolling_mean": rolling[position].round(6).tolist(),
+                "ranks": ranks[position].tolist(),
+            }
+        items.append(item)
+    items.sort(key=lambda item: item["rolling_mean"], reverse=True)
+    return items
@@ -0,0 +1,50 @@
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from scipy.stats import kendalltau, rankdata
+
+
+def ordinal_ranks(scores: np.ndarray) -> np.ndarray:
+    """1-based rank of every row, best score first; ties keep input order like rank_ads."""
+    order = np.argsort(-scores, axis=-1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(1, scores.shape[-1] + 1), order.shape), axis=-1)
+    return ranks
+
+
+def _finite(value: float) -> Optional[float]:
+    return None if value is None or math.isnan(value) else float(value)
+
+
+def compare_rankings(production: np.ndarray, variants: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+    """Rank agreement of each variant's scores (variant, row) with the production scores (row,).
+
+    Spearman and Kendall tau-b use tie-aware ranks and are None when a ranking is constant;
+    top-k overlap and rank shifts use the ordinal ranks that are returned to clients.
+    """
+    rows = len(production)
+    top_k = max(1, min(top_k, rows)) if rows else 0
+    production_ranks = ordinal_ranks(production)
+    variant_ranks = ordinal_ranks(variants)
+
+    # Spearman = Pearson correlation of average ranks, for all variants at once
+    average = rankdata(-np.vstack([production, variants]), axis=1)
+    centered = average - average.mean(axis=1, keepdims=True)
+    norms = np.sqrt((centered ** 2).sum(axis=1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        spearman = centered[1:] @ centered[0] / (norms[1:] * norms[0])
+
+    production_top = production_ranks <= top_k
+    stats = []
+    for variant in range(len(variants)):
+        shifts = np.abs(variant_ranks[variant] - production_ranks)
+        tau = kendalltau(production, variants[variant]).statistic if rows > 1 else None
+        stats.append({
+            "spearman": _finite(spearman[variant]) if rows > 1 else None,
+            "kendall_tau": _finite(tau),
+            "top_k_overlap": float((production_top & (variant_ranks[variant] <= top_k)).sum() / top_k) if rows else None,
+            "mean_rank_shift": float(shifts.mean()) if rows else 0.0,
+            "max_rank_shift": int(shifts.max()) if rows else 0,
+        })
+    return stats
@@ -0,0 +1,205 @@
+"""End-to-end load test driving the app with a mix of dashboard and ad-creation traffic.
+
+Run the stand-in (loadtest.stub_server) and the app pointed at it, then:
+
+    python -m loadtest.harness --app-url http://127.0.0.1:5000 --duration 60 --concurrency 20 --mix dashboard=80,create=20
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+
+class Recorder:
+    """Thread-safe collection of (operation, latency, ok) samples."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Tuple[float, bool]]] = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, ok: bool) -> None:
+        with self.lock:
+            self.samples[name].append((seconds, ok))
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    everything: List[Tuple[float, bool]] = []
+    for name, samples in sorted(recorder.samples.items()):
+        everything.extend(samples)
+        summary[name] = _stats(samples, elapsed)
+    summary['TOTAL'] = _stats(everything, elapsed)
+    return summary
+
+
+def _stats(samples: List[Tuple[float, bool]], elapsed: float) -> Dict[str, float]:
+    latencies = sorted(seconds * 1000 for seconds, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'rps': len(samples) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50),
+        'p90_ms': percentile(latencies, 90),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': latencies[-1] if latencies else 0.0,
+    }
+
+
+def print_report(summary: Dict[str, Dict[str, float]], elapsed: float) -> None:
+    print(f"\nLoad test finished in {elapsed:.1f}s\n")
+    header = f"{'operation':<28}{'requests':>10}{'errors':>8}{'rps':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print('-' * len(header))
+    for name, stats in summary.items():
+        print(f"{name:<28}{stats['requests']:>10}{stats['errors']:>8}{stats['rps']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p90_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}")
+    print("\nLatencies in milliseconds.")
+
+
+def make_test_video(frames: int = 30) -> str:
+    """Write a small MP4 so /ad can extract a thumbnail."""
+    import cv2
+    import numpy as np
+
+    path = os.path.join(tempfile.gettempdir(), 'loadtest_ad.mp4')
+    if os.path.exists(path):
+        return path
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 15, (320, 240))
+    for i in range(frames):
+        frame = np.full((240, 320, 3), (i * 8) % 255, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+class Scenario:
+    """User flows issued against the app. Each flow records one sample per HTTP call."""
+
+    def __init__(self, app_url: str, recorder: Recorder, video_path: str):
+        self.app_url = app_url.rstrip('/')
+        self.recorder = recorder
+        self.video_path = video_path
+        self.local = threading.local()
+        self.advertiser_ids: List[str] = []
+        self.campaign_ids: List[str] = []
+
+    @property
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def call(self, name: str, method: str, path: str, **kwargs) -> Optional[requests.Response]:
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.app_url}{path}", timeout=120, **kwargs)
+        except requests.RequestException:
+            self.recorder.record(name, time.perf_counter() - started, False)
+            return None
+        ok = response.status_code < 400
+        if ok and response.headers.get('content-type', '').startswith('application/json'):
+            body = response.json()
+            ok = body.get('success', True) is not False
+        self.recorder.record(name, time.perf_counter() - started, ok)
+        return response
+
+    def setup(self) -> None:
+        """Seed an access token through /callback and discover advertisers and campaigns."""
+        response = requests.post(f"{self.app_url}/callback", json={'url': 'http://localhost/callback?auth_code=loadtest&state=loadtest'}, timeout=30)
+        response.raise_for_status()
+        advertisers = requests.get(f"{self.app_url}/get_advertiser", timeout=30).json()
+        self.advertiser_ids = [item['id'] for item in advertisers.get('data', [])]
+        campaigns = requests.get(f"{self.app_url}/campaign", timeout=30).json()
+        self.campaign_ids = [item['id'] for item in campaigns.get('data', [])]
+        if not self.advertiser_ids or not self.campaign_ids:
+            raise RuntimeError('The upstream returned no advertisers or campaigns')
+
+    def dashboard(self) -> None:
+        advertiser_id = random.choice(self.advertiser_ids)
+        campaign_id = random.choice(self.campaign_ids)
+        self.call('GET /get_advertiser', 'GET', '/get_advertiser')
+        self.call('GET /campaign', 'GET', '/campaign')
+        self.call('GET /ad_group', 'GET', '/ad_group', params={'filtering': json.dumps({'campaign_ids': [campaign_id]})})
+        level = random.choice(['ad', 'adgroup', 'campaign'])
+        self.call(f'GET /report/{level}', 'GET', f'/report/{level}', params={'advertiser_id': advertiser_id})
+        self.call('POST /analyze-campaign', 'POST', '/analyze-campaign', params={'advertiser_id': advertiser_id, 'campaign_id': campaign_id})
+
+    def create(self) -> None:
+        suffix = f"{int(time.time() * 1000)}-{random.randrange(10 ** 6)}"
+        self.call('POST /campaign', 'POST', '/campaign', json={'campaign_name': f"Load test {suffix}", 'campaign_budget': 100000})
+        campaign_id = random.choice(self.campaign_ids)
+        self.call('POST /ad_group', 'POST', '/ad_group', json={'campaign_id': campaign_id, 'ad_group_name': f"Load test {suffix}", 'ad_group_budget': 50000})
+        with open(self.video_path, 'rb') as video:
+            self.call('POST /ad', 'POST', '/ad', data={
+                'advertiser_id': random.choice(self.advertiser_ids), 'campaign_id': campaign_id,
+                'ad_group_id': 'loadtest', 'ad_name': f"Load test {suffix}",
+            }, files={'ad_file': ('loadtest.mp4', video, 'video/mp4')})
+
+
+def parse_mix(value: str) -> List[Tuple[str, int]]:
+    mix = []
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        mix.append((name.strip(), int(weight or 1)))
+    return mix
+
+
+def run(scenario: Scenario, mix: List[Tuple[str, int]], duration: float, concurrency: int) -> float:
+    flows: List[Callable[[], None]] = [getattr(scenario, name) for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    deadline = time.monotonic() + duration
+
+    def worker() -> None:
+        while time.monotonic() < deadline:
+            random.choices(flows, weights)[0]()
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return time.monotonic() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Drive dashboard and ad-creation traffic against the app.")
+    parser.add_argument('--app-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run')
+    parser.add_argument('--concurrency', type=int, default=10, help='concurrent simulated users')
+    parser.add_argument('--mix', default='dashboard=80,create=20', help='weighted flows, e.g. dashboard=80,create=20')
+    parser.add_argument('--video', default=None, help='video uploaded by the create flow (generated if omitted)')
+    parser.add_argument('--json', dest='json_path', default=None, help='also write the summary as JSON to this path')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    recorder = Recorder()
+    video_path = args.video or (make_test_video() if any(name == 'create' for name, _ in mix) else '')
+    scenario = Scenario(args.app_url, recorder, video_path)
+    scenario.setup()
+
+    elapsed = run(scenario, mix, args.duration, args.concurrency)
+    summary = summarize(recorder, elapsed)
+    print_report(summary, elapsed)
+    if args.json_path:
+        with open(args.json_path, 'w') as output:
+            json.dump({'elapsed': elapsed, 'concurrency': args.concurrency, 'mix': dict(mix), 'operations': summary}, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+"""Local stand-in for the TikTok Business API.
+
+Implements the endpoints used by app/main.py with synthetic accounts of configurable size, plus latency,
+error and rate-limit injection. Point the app at it with:
+
+    API_URL=http://127.0.0.1:5100/open_api/v1.3 API_URL_SB=http://127.0.0.1:5100/open_api/v1.3 python run.py
+
+and start it with:
+
+    python -m loadtest.stub_server --port 5100 --campaigns 20 --adgroups 10 --ads 10 --latency-ms 80
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import FastAPI, APIRouter, Request
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+API_PREFIX = "/open_api/v1.3"
+
+# TikTok API error codes returned by the injected failures
+CODE_OK = 0
+CODE_INVALID_PARAM = 40002
+CODE_RATE_LIMIT = 40100
+CODE_INTERNAL = 50000
+
+# Longest start_date..end_date range accepted together with the stat_time_day dimension
+DAILY_RANGE_DAYS = 30
+
+
+class StubConfig(BaseModel):
+    """Runtime behaviour of the stand-in; can be changed live through POST /_stub/config."""
+    latency_ms: float = 50.0
+    latency_jitter_ms: float = 20.0
+    upload_latency_ms: float = 300.0
+    error_rate: float = 0.0
+    rate_limit_per_sec: float = 0.0
+    advertisers: int = 2
+    campaigns: int = 10
+    adgroups: int = 5
+    ads: int = 5
+    seed: int = 42
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class StubState:
+    """Synthetic accounts, generated on first access per advertiser and kept in memory."""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.accounts: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+        self.buckets: Dict[str, _TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def advertiser_ids(self) -> List[str]:
+        return [str(7000000000000000000 + i + 1) for i in range(self.config.advertisers)]
+
+    def account(self, advertiser_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        with self.lock:
+            if advertiser_id not in self.accounts:
+                self.accounts[advertiser_id] = self._generate(advertiser_id)
+            return self.accounts[advertiser_id]
+
+    def _generate(self, advertiser_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        config = self.config
+        rng = random.Random(config.seed ^ zlib.crc32(advertiser_id.encode()))
+        base = int(advertiser_id[-6:]) if advertiser_id[-6:].isdigit() else rng.randint(0, 999999)
+        campaigns, adgroups, ads = [], [], []
+        for c in range(config.campaigns):
+            campaign_id = f"17{base:06d}{c:05d}"
+            campaigns.append({
+                'advertiser_id': advertiser_id, 'campaign_id': campaign_id, 'campaign_name': f"Campaign {c + 1}",
+                'budget': float(rng.choice([100000, 250000, 500000, 1000000])), 'operation_status': 'ENABLE',
+            })
+            for g in range(config.adgroups):
+                adgroup_id = f"{campaign_id}{g:04d}"
+                adgroups.append({
+                    'advertiser_id': advertiser_id, 'campaign_id': campaign_id, 'campaign_name': f"Campaign {c + 1}",
+                    'adgroup_id': adgroup_id, 'adgroup_name': f"Ad Group {c + 1}.{g + 1}",
+                    'budget': float(rng.choice([50000, 100000, 200000])), 'operation_status': 'ENABLE',
+                })
+                for a in range(config.ads):
+                    ads.append({
+                        'advertiser_id': advertiser_id, 'campaign_id': campaign_id, 'campaign_name': f"Campaign {c + 1}",
+                        'adgroup_id': adgroup_id, 'adgroup_name': f"Ad Group {c + 1}.{g + 1}",
+                        'ad_id': f"{adgroup_id}{a:04d}", 'ad_name': f"Ad {c + 1}.{g + 1}.{a + 1}",
+                        'operation_status': 'ENABLE',
+                    })
+        return {'campaign': campaigns, 'adgroup': adgroups, 'ad': ads}
+
+    def allow(self, key: str) -> bool:
+        rate = self.config.rate_limit_per_sec
+        if rate <= 0:
+            return True
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None or bucket.rate != rate:
+                bucket = self.buckets[key] = _TokenBucket(rate)
+            return bucket.take()
+
+
+def _metrics_for(entity_id: str, seed: int, day: Optional[str] = None) -> Dict[str, str]:
+    """Deterministic synthetic report metrics for an entity (and optionally a day)."""
+    key = f"{entity_id}:{day}" if day else entity_id
+    rng = random.Random(seed ^ zlib.crc32(key.encode()))
+    impressions = int(rng.lognormvariate(9 if day else 11, 1.2))
+    clicks = int(impressions * rng.uniform(0.002, 0.05))
+    conversion = int(clicks * rng.uniform(0.0, 0.2))
+    spend = round(impressions * rng.uniform(0.5, 4.0) / 1000, 2)
+    return {
+        'impressions': str(impressions),
+        'clicks': str(clicks),
+        'conversion': str(conversion),
+        'spend': f"{spend:.2f}",
+        'ctr': f"{(clicks / impressions * 100) if impressions else 0:.2f}",
+        'conversion_rate': f"{(conversion / clicks * 100) if clicks else 0:.2f}",
+        'cpc': f"{(spend / clicks) if clicks else 0:.2f}",
+    }
+
+
+def _ok(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {'code': CODE_OK, 'message': 'OK', 'request_id': uuid.uuid4().hex, 'data': data}
+
+
+def _error(code: int, message: str, status_code: int = 200) -> JSONResponse:
+    # TikTok reports most failures with HTTP 200 and a non-zero `code`
+    return JSONResponse(status_code=status_code, content={'code': code, 'message': message, 'request_id': uuid.uuid4().hex, 'data': {}})
+
+
+def _json_param(value: Optional[str], default: Any) -> Any:
+    if not value:
+        return default
+    try:
+        return json.loads(value)
+    except ValueError:
+        return default
+
+
+def _paginate(items: Sequence[Dict[str, Any]], page: int, page_size: int) -> Dict[str, Any]:
+    page = max(page, 1)
+    page_size = max(min(page_size, 1000), 1)
+    total = len(items)
+    start = (page - 1) * page_size
+    return {
+        'list': items[start:start + page_size],
+        'page_info': {'page': page, 'page_size': page_size, 'total_number': total, 'total_page': (total + page_size - 1) // page_size},
+    }
+
+
+class _DailyRows:
+    """Report rows for every entity x day, built only for the requested page."""
+
+    def __init__(self, items: List[Dict[str, Any]], days: List[str], dimension: str, seed: int):
+        self.items, self.days, self.dimension, self.seed = items, days, dimension, seed
+
+    def __len__(self) -> int:
+        return len(self.items) * len(self.days)
+
+    def __getitem__(self, window: slice) -> List[Dict[str, Any]]:
+        rows = []
+        for position in range(*window.indices(len(self))):
+            entity_id = self.items[position // len(self.days)][self.dimension]
+            day = self.days[position % len(self.days)]
+            rows.append({
+                'dimensions': {self.dimension: entity_id, 'stat_time_day': f"{day} 00:00:00"},
+                'metrics': _metrics_for(entity_id, self.seed, day),
+            })
+        return rows
+
+
+def _days(start_date: str, end_date: str) -> List[str]:
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+
+def _filter_by_campaign(items: List[Dict[str, Any]], filtering: Dict[str, Any]) -> List[Dict[str, Any]]:
+    campaign_ids = filtering.get('campaign_ids') if isinstance(filtering, dict) else None
+    if campaign_ids:
+        wanted = {str(campaign_id) for campaign_id in campaign_ids}
+        items = [item for item in items if item['campaign_id'] in wanted]
+    adgroup_ids = filtering.get('adgroup_ids') if isinstance(filtering, dict) else None
+    if adgroup_ids:
+        wanted = {str(adgroup_id) for adgroup_id in adgroup_ids}
+        items = [item for item in items if item.get('adgroup_id') in wanted]
+    return items
+
+
+def create_stub_app(config: Optional[StubConfig] = None) -> FastAPI:
+    state = StubState(config or StubConfig())
+    app = FastAPI(title="TikTok Business API stand-in")
+    router = APIRouter(prefix=API_PREFIX)
+    app.state.stub = state
+
+    @app.middleware("http")
+    async def inject_faults(request: Request, call_next):
+        if not request.url.path.startswith(API_PREFIX):
+            return await call_next(request)
+        config = state.config
+        is_upload = '/file/' in request.url.path
+        delay = (config.upload_latency_ms if is_upload else config.latency_ms) + random.uniform(-1, 1) * config.latency_jitter_ms
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if not state.allow(request.headers.get('Access-Token', 'anonymous')):
+            return _error(CODE_RATE_LIMIT, 'Too many requests. Please retry in some time.')
+        if config.error_rate > 0 and random.random() < config.error_rate:
+            return _error(CODE_INTERNAL, 'Injected internal error')
+        return await call_next(request)
+
+    @app.get("/_stub/config")
+    async def read_config():
+        return state.config.model_dump()
+
+    @app.post("/_stub/config")
+    async def update_config(changes: Dict[str, Any]):
+        state.config = state.config.model_copy(update=changes)
+        if {'advertisers', 'campaigns', 'adgroups', 'ads', 'seed'} & changes.keys():
+            with state.lock:
+                state.accounts.clear()
+        return state.config.model_dump()
+
+    @router.post("/oauth2/access_token/")
+    async def access_token(data: Dict[str, Any]):
+        if not data.get('auth_code'):
+            return _error(CODE_INVALID_PARAM, 'auth_code is required')
+        return _ok({'access_token': uuid.uuid4().hex, 'advertiser_ids': state.advertiser_ids(), 'scope': [1, 2, 3, 4]})
+
+    @router.get("/oauth2/advertiser/get/")
+    async def advertiser_get():
+        return _ok({'list': [{'advertiser_id': advertiser_id, 'advertiser_name': f"Advertiser {i + 1}"}
+                             for i, advertiser_id in enumerate(state.advertiser_ids())]})
+
+    @router.get("/advertiser/info/")
+    async def advertiser_info(advertiser_ids: str):
+        ids = _json_param(advertiser_ids, [])
+        return _ok({'list': [{'advertiser_id': str(advertiser_id), 'name': f"Advertiser {advertiser_id}", 'currency': 'IDR'}
+                             for advertiser_id in ids]})
+
+    def _entity_get(level: str):
+        async def handler(advertiser_id: str, filtering: Optional[str] = None, page: int = 1, page_size: int = 10):
+            items = _filter_by_campaign(state.account(advertiser_id)[level], _json_param(filtering, {}))
+            return _ok(_paginate(items, page, page_size))
+        return handler
+
+    for level in ('campaign', 'adgroup', 'ad'):
+        router.add_api_route(f"/{level}/get/", _entity_get(level), methods=['GET'])
+
+    @router.post("/campaign/create/")
+    async def campaign_create(data: Dict[str, Any]):
+        if not data.get('campaign_name') or not data.get('budget'):
+            return _error(CODE_INVALID_PARAM, 'campaign_name and budget are required')
+        account = state.account(str(data.get('advertiser_id')))
+        campaign_id = str(1800000000000000000 + random.randrange(10 ** 17))
+        account['campaign'].append({
+            'advertiser_id': str(data.get('advertiser_id')), 'campaign_id': campaign_id, 'campaign_name': data['campaign_name'],
+            'budget': float(data['budget']), 'operation_status': 'ENABLE',
+        })
+        return _ok({'campaign_id': campaign_id})
+
+    @router.post("/adgroup/create/")
+    async def adgroup_create(data: Dict[str, Any]):
+        if not data.get('campaign_id') or not data.get('adgroup_name'):
+            return _error(CODE_INVALID_PARAM, 'campaign_id and adgroup_name are required')
+        account = state.account(str(data.get('advertiser_id')))
+        adgroup_id = str(1800000000000000000 + random.randrange(10 ** 17))
+        account['adgroup'].append({
+            'advertiser_id': str(data.get('advertiser_id')), 'campaign_id': str(data['campaign_id']), 'campaign_name': '',
+            'adgroup_id': adgroup_id, 'adgroup_name': data['adgroup_name'],
+            'budget': float(data.get('budget') or 0), 'operation_status': 'ENABLE',
+        })
+        return _ok({'adgroup_id': adgroup_id})
+
+    @router.post("/ad/create/")
+    async def ad_create(data: Dict[str, Any]):
+        creatives = data.get('creatives') or []
+        if not data.get('adgroup_id') or not creatives:
+            return _error(CODE_INVALID_PARAM, 'adgroup_id and creatives are required')
+        account = state.account(str(data.get('advertiser_id')))
+        ad_ids = []
+        for creative in creatives:
+            ad_id = str(1800000000000000000 + random.randrange(10 ** 17))
+            ad_ids.append(ad_id)
+            account['ad'].append({
+                'advertiser_id': str(data.get('advertiser_id')), 'campaign_id': '', 'campaign_name': '',
+                'adgroup_id': str(data['adgroup_id']), 'adgroup_name': '',
+                'ad_id': ad_id, 'ad_name': creative.get('ad_name', ''), 'operation_status': 'ENABLE',
+            })
+        return _ok({'ad_ids': ad_ids})
+
+    @router.get("/report/integrated/get/")
+    async def report_integrated(
+        advertiser_id: str,
+        data_level: str = 'AUCTION_CAMPAIGN',
+        dimensions: Optional[str] = None,
+        filtering: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 10,
+    ):
+        level = {'AUCTION_AD': 'ad', 'AUCTION_ADGROUP': 'adgroup', 'AUCTION_CAMPAIGN': 'campaign'}.get(data_level)
+        if level is None:
+            return _error(CODE_INVALID_PARAM, f'Unsupported data_level {data_level}')
+        dimension_list = _json_param(dimensions, [f"{level}_id"])
+        entity_dimension = next((dimension for dimension in dimension_list if dimension != 'stat_time_day'), f"{level}_id")
+        items = _filter_by_campaign(state.account(advertiser_id)[level], _json_param(filtering, {}))
+        if 'stat_time_day' in dimension_list:
+            try:
+                days = _days(start_date, end_date)
+            except (TypeError, ValueError):
+                return _error(CODE_INVALID_PARAM, 'start_date and end_date (YYYY-MM-DD) are required with stat_time_day')
+            if not days or len(days) > DAILY_RANGE_DAYS:
+                return _error(CODE_INVALID_PARAM, f'stat_time_day reports cover at most {DAILY_RANGE_DAYS} days')
+            # Daily reports run to thousands of rows per page; skip FastAPI's slow response encoding
+            return JSONResponse(_ok(_paginate(_DailyRows(items, days, entity_dimension, state.config.seed), page, page_size)))
+        rows = [
+            {'dimensions': {entity_dimension: item[entity_dimension]}, 'metrics': _metrics_for(item[entity_dimension], state.config.seed)}
+            for item in items
+        ]
+        return _ok(_paginate(rows, page, page_size))
+
+    @router.post("/file/video/ad/upload/")
+    async def video_upload(request: Request):
+        form = await request.form()
+        if 'video_file' not in form:
+            return _error(CODE_INVALID_PARAM, 'video_file is required')
+        return _ok([{'video_id': f"v10{uuid.uuid4().hex[:16]}", 'file_name': form.get('file_name')}])
+
+    @router.post("/file/image/ad/upload/")
+    async def image_upload(request: Request):
+        form = await request.form()
+        if 'image_file' not in form:
+            return _error(CODE_INVALID_PARAM, 'image_file is required')
+        return _ok({'image_id': f"ad-site-i18n-sg/{uuid.uuid4().hex}", 'file_name': form.get('file_name')})
+
+    @router.get("/identity/get/")
+    async def identity_get(advertiser_id: str, identity_type: str = 'TT_USER'):
+        return _ok({'identity_list': [{'identity_id': f"identity-{advertiser_id}", 'identity_type': identity_type, 'display_name': 'Load Test'}]})
+
+    app.include_router(router)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the local TikTok Business API stand-in.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5100)
+    defaults = StubConfig()
+    for name, field in StubConfig.model_fields.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(getattr(defaults, name)), default=getattr(defaults, name))
+    args = parser.parse_args()
+
+    import uvicorn
+    config = StubConfig(**{name: getattr(args, name) for name in StubConfig.model_fields})
+    uvicorn.run(create_stub_app(config), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
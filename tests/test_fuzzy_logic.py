@@ -0,0 +1,33 @@
+import itertools
+
+import numpy as np
+
+from app.utils.fuzzy_logic import FuzzyRanking, INPUTS, MEMBERSHIP_PARAMS
+
+# Bound stated for compute_rankings in the README: only float64 rounding differs from skfuzzy
+TOLERANCE = 1e-12
+
+
+def _reference(ranker, rows):
+    return np.array([ranker.compute_ranking(dict(zip(INPUTS, row))) for row in rows])
+
+
+def test_compute_rankings_matches_skfuzzy_at_membership_breakpoints():
+    ranker = FuzzyRanking()
+    breakpoints = [sorted({value for params in MEMBERSHIP_PARAMS[name].values() for value in params}) for name in INPUTS]
+    rows = np.array(list(itertools.product(*breakpoints)))
+    # Also just beside every combination, where a rule starts or stops firing
+    rng = np.random.default_rng(0)
+    beside = np.clip(rows + rng.choice([-1e-3, 1e-3], size=rows.shape), 0, 1)
+    rows = np.vstack([rows, beside])
+    scores = ranker.compute_rankings(*rows.T)
+    assert np.abs(scores - _reference(ranker, rows)).max() < TOLERANCE
+
+
+def test_compute_rankings_matches_skfuzzy_on_random_inputs():
+    ranker = FuzzyRanking()
+    rng = np.random.default_rng(1)
+    # Half uniform, half skewed towards 0 where most membership breakpoints are
+    rows = np.vstack([rng.random((60, 3)), rng.random((60, 3)) ** 4])
+    scores = ranker.compute_rankings(*rows.T)
+    assert np.abs(scores - _reference(ranker, rows)).max() < TOLERANCE
@@ -0,0 +1,15 @@
+import statistics
+
+from app.utils.import_report import DEFAULT_BUDGET_MS, HEAVY_MODULES, probe
+
+
+def test_cold_import_of_app_main_stays_within_budget():
+    # Median of a few fresh interpreters so one slow start does not fail the run
+    results = [probe()[0] for _ in range(3)]
+    import_ms = statistics.median(result['import_ms'] for result in results)
+    assert import_ms < DEFAULT_BUDGET_MS, f"cold import of app.main took {import_ms:.0f} ms (budget {DEFAULT_BUDGET_MS} ms)"
+
+
+def test_import_of_app_main_does_not_load_heavy_dependencies():
+    result, _ = probe()
+    assert result['heavy_modules'] == [], f"loaded on import: {result['heavy_modules']} (expected none of {HEAVY_MODULES})"